@@ -4,8 +4,10 @@ from pathlib import Path
 from typing import Annotated
 
 import typer
-from rich import print as rprint
 
+# Keep module import cheap: `--help` and shell completion only need typer.
+# Pipeline modules (pandas/pyarrow/sklearn), config loading and rich are
+# imported inside each command body.
 app = typer.Typer(no_args_is_help=True)
 
 DEFAULT_CONFIG_PATH = Path("configs/default.yaml")
@@ -16,6 +18,8 @@ def show_paths(
     config: Annotated[Path, typer.Option("--config")] = DEFAULT_CONFIG_PATH,
 ) -> None:
     """Print resolved absolute paths from the config."""
+    from rich import print as rprint
+
     from retail_ops_mlops.utils.config import load_cfg
 
     cfg = load_cfg(config)
@@ -30,6 +34,8 @@ def ensure_dirs(
     config: Annotated[Path, typer.Option("--config")] = DEFAULT_CONFIG_PATH,
 ) -> None:
     """Create required data/outputs directories (idempotent)."""
+    from rich import print as rprint
+
     from retail_ops_mlops.utils.config import ensure_project_dirs, load_cfg
 
     cfg = load_cfg(config)
@@ -37,16 +43,35 @@ def ensure_dirs(
     rprint("[green]OK[/green]: ensured directories")
 
 
+@app.command("bronze-m5")
+def bronze_m5(
+    config: Annotated[Path, typer.Option("--config")] = DEFAULT_CONFIG_PATH,
+    force: Annotated[bool, typer.Option("--force")] = False,
+    strict: Annotated[bool, typer.Option("--strict/--no-strict")] = True,
+    jobs: Annotated[int | None, typer.Option("--jobs", "-j", min=1)] = None,
+) -> None:
+    """Convert raw M5 CSVs to bronze Parquet (files processed in parallel)."""
+    from rich import print as rprint
+
+    from retail_ops_mlops.pipelines.bronze_m5 import run
+
+    report = run(config_path=config, force=force, strict=strict, jobs=jobs)
+    rprint(f"[green]OK[/green]: wrote report: {report}")
+
+
 @app.command("build-features-m5")
 def build_features_m5(
     config: Annotated[Path, typer.Option("--config")] = DEFAULT_CONFIG_PATH,
     horizon: Annotated[int, typer.Option("--horizon")] = 28,
     force: Annotated[bool, typer.Option("--force")] = False,
+    engine: Annotated[str, typer.Option("--engine", help="pandas | polars")] = "pandas",
 ) -> None:
     """Build M5 features table (gold) used by train/eval."""
+    from rich import print as rprint
+
     from retail_ops_mlops.pipelines.build_features_m5 import run
 
-    report = run(config_path=config, horizon=horizon, force=force)
+    report = run(config_path=config, horizon=horizon, force=force, engine=engine)
     rprint(f"[green]OK[/green]: wrote report: {report}")
 
 
@@ -57,6 +82,8 @@ def dq_m5(
     force: Annotated[bool, typer.Option("--force")] = False,
 ) -> None:
     """Run DQ checks for M5 features table (fails fast on bad data)."""
+    from rich import print as rprint
+
     from retail_ops_mlops.pipelines.dq_m5 import run
 
     report = run(config_path=config, horizon=horizon, force=force)
@@ -68,11 +95,14 @@ def train_m5(
     config: Annotated[Path, typer.Option("--config")] = DEFAULT_CONFIG_PATH,
     horizon: Annotated[int, typer.Option("--horizon")] = 28,
     force: Annotated[bool, typer.Option("--force")] = False,
+    model: Annotated[str, typer.Option("--model", help="ridge | lightgbm")] = "ridge",
 ) -> None:
     """Train baseline model on M5 gold sample and write artifacts."""
+    from rich import print as rprint
+
     from retail_ops_mlops.pipelines.train_m5 import run
 
-    report = run(config_path=config, horizon=horizon, force=force)
+    report = run(config_path=config, horizon=horizon, force=force, model=model)
     rprint(f"[green]OK[/green]: wrote report: {report}")
 
 
@@ -81,11 +111,14 @@ def eval_m5(
     config: Annotated[Path, typer.Option("--config")] = DEFAULT_CONFIG_PATH,
     horizon: Annotated[int, typer.Option("--horizon")] = 28,
     force: Annotated[bool, typer.Option("--force")] = False,
+    model: Annotated[str, typer.Option("--model", help="ridge | lightgbm")] = "ridge",
 ) -> None:
     """Evaluate trained M5 baseline and write figures/tables/reports."""
+    from rich import print as rprint
+
     from retail_ops_mlops.pipelines.eval_m5 import run
 
-    report = run(config_path=config, horizon=horizon, force=force)
+    report = run(config_path=config, horizon=horizon, force=force, model=model)
     rprint(f"[green]OK[/green]: wrote report: {report}")
 
 
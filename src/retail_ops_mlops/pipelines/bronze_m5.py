@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-import hashlib
-import json
 import logging
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
@@ -12,7 +11,8 @@ import pyarrow as pa
 import pyarrow.csv as pc
 import pyarrow.parquet as pq
 
-from retail_ops_mlops.utils.config import ensure_dirs, load_config
+from retail_ops_mlops.utils.config import ensure_dirs, load_config, utc_now_iso, write_json
+from retail_ops_mlops.utils.hashing import cached_sha256
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +25,42 @@ EXPECTED_FILES = (
     "sell_prices.csv",
 )
 
+# Explicit Arrow types per file: skips CSV type inference and writes narrow
+# columns (int16 daily unit sales, dictionary-encoded ids). Columns not listed
+# are still inferred; names absent from a file are ignored.
+_STR_DICT = pa.dictionary(pa.int32(), pa.string())
+_SALES_TYPES: dict[str, pa.DataType] = {
+    **dict.fromkeys(("id", "item_id", "dept_id", "cat_id", "store_id", "state_id"), _STR_DICT),
+    **{f"d_{i}": pa.int16() for i in range(1, 1942)},
+}
+SCHEMAS: dict[str, dict[str, pa.DataType]] = {
+    "calendar.csv": {
+        "date": pa.string(),
+        "wm_yr_wk": pa.int32(),
+        "weekday": _STR_DICT,
+        "wday": pa.int16(),
+        "month": pa.int16(),
+        "year": pa.int16(),
+        "d": pa.string(),
+        **dict.fromkeys(
+            ("event_name_1", "event_type_1", "event_name_2", "event_type_2"), _STR_DICT
+        ),
+        **dict.fromkeys(("snap_CA", "snap_TX", "snap_WI"), pa.int8()),
+    },
+    "sales_train_evaluation.csv": _SALES_TYPES,
+    "sales_train_validation.csv": _SALES_TYPES,
+    "sample_submission.csv": {
+        "id": pa.string(),
+        **{f"F{i}": pa.float32() for i in range(1, 29)},
+    },
+    "sell_prices.csv": {
+        "store_id": _STR_DICT,
+        "item_id": _STR_DICT,
+        "wm_yr_wk": pa.int32(),
+        "sell_price": pa.float32(),
+    },
+}
+
 
 @dataclass
 class BronzeFileReport:
@@ -54,26 +90,34 @@ class BronzeReport:
     notes: dict[str, Any]
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
-    return h.hexdigest()
+def _stat_or_none(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
 
 
 def csv_to_parquet_stream(
     csv_path: Path,
     parquet_path: Path,
     *,
-    compression: str = "snappy",
+    compression: str = "zstd",
+    compression_level: int | None = 1,
+    column_types: dict[str, pa.DataType] | None = None,
+    use_threads: bool = True,
 ) -> int:
-    """Stream CSV -> Parquet in batches to avoid loading huge CSVs into RAM."""
+    """
+    Stream CSV -> Parquet in batches to avoid loading huge CSVs into RAM.
+
+    zstd level 1 keeps CSV parsing the bottleneck while shrinking files ~35% vs snappy.
+    use_threads=False parses on the calling thread only (for callers that already
+    convert several files concurrently).
+    """
     parquet_path.parent.mkdir(parents=True, exist_ok=True)
 
-    read_options = pc.ReadOptions(block_size=1 << 20, use_threads=True)
+    read_options = pc.ReadOptions(block_size=8 << 20, use_threads=use_threads)
     parse_options = pc.ParseOptions(delimiter=",", quote_char='"', double_quote=True)
-    convert_options = pc.ConvertOptions()
+    convert_options = pc.ConvertOptions(column_types=column_types)
 
     reader = pc.open_csv(
         csv_path,
@@ -89,12 +133,18 @@ def csv_to_parquet_stream(
         while True:
             batch = reader.read_next_batch()
             rows += batch.num_rows
-            table = pa.Table.from_batches([batch])
 
             if writer is None:
-                writer = pq.ParquetWriter(parquet_path, table.schema, compression=compression)
+                writer = pq.ParquetWriter(
+                    parquet_path,
+                    batch.schema,
+                    compression=compression,
+                    compression_level=compression_level,
+                    use_dictionary=True,
+                    write_statistics=True,
+                )
 
-            writer.write_table(table)
+            writer.write_batch(batch)
     except StopIteration:
         pass
     finally:
@@ -104,22 +154,89 @@ def csv_to_parquet_stream(
     return rows
 
 
+def _process_one(
+    name: str,
+    raw_extracted: Path,
+    bronze_dir: Path,
+    *,
+    force: bool,
+    use_threads: bool = True,
+) -> BronzeFileReport:
+    csv_path = raw_extracted / name
+    parquet_path = bronze_dir / name.replace(".csv", ".parquet")
+
+    # One stat() per path, reused for existence, sizes and the digest cache key.
+    csv_st = _stat_or_none(csv_path)
+    pq_st = _stat_or_none(parquet_path)
+
+    if csv_st is None:
+        return BronzeFileReport(
+            name=name,
+            status="missing",
+            csv_path=str(csv_path),
+            parquet_path=None,
+            rows=None,
+            csv_bytes=None,
+            parquet_bytes=None,
+            csv_sha256=None,
+            parquet_sha256=None,
+        )
+
+    if pq_st is not None and not force:
+        rows = pq.read_metadata(parquet_path).num_rows
+        return BronzeFileReport(
+            name=name,
+            status="exists",
+            csv_path=str(csv_path),
+            parquet_path=str(parquet_path),
+            rows=rows,
+            csv_bytes=csv_st.st_size,
+            parquet_bytes=pq_st.st_size,
+            csv_sha256=cached_sha256(csv_path, bronze_dir, csv_st),
+            parquet_sha256=cached_sha256(parquet_path, bronze_dir, pq_st),
+        )
+
+    logger.info("Bronze: %s -> %s", csv_path.name, parquet_path.name)
+    rows = csv_to_parquet_stream(
+        csv_path, parquet_path, column_types=SCHEMAS.get(name), use_threads=use_threads
+    )
+    pq_st = parquet_path.stat()
+
+    return BronzeFileReport(
+        name=name,
+        status="ok",
+        csv_path=str(csv_path),
+        parquet_path=str(parquet_path),
+        rows=rows,
+        csv_bytes=csv_st.st_size,
+        parquet_bytes=pq_st.st_size,
+        csv_sha256=cached_sha256(csv_path, bronze_dir, csv_st),
+        parquet_sha256=cached_sha256(parquet_path, bronze_dir, pq_st),
+    )
+
+
 def run(
     config_path: str | Path = "configs/default.yaml",
     *,
+    cfg: dict[str, Any] | None = None,
     force: bool = False,
     strict: bool = True,
+    jobs: int | None = None,
 ) -> Path:
     """
     Bronze layer for M5:
     - Input:  data/raw/m5/extracted/*.csv (immutable raw)
     - Output: data/interim/m5/bronze/*.parquet
     - Report: outputs/reports/bronze_m5.json
+
+    jobs: files converted+hashed concurrently (default: one per expected file,
+    capped at the CPU count).
     """
-    cfg = load_config(config_path)
+    if cfg is None:
+        cfg = load_config(config_path)
     ensure_dirs(cfg)
 
-    started = datetime.now(timezone.utc)
+    started = utc_now_iso()
 
     raw_extracted = cfg["paths"]["data_raw"] / DATASET_ID / "extracted"
     bronze_dir = cfg["paths"]["data_interim"] / DATASET_ID / "bronze"
@@ -133,6 +250,11 @@ def run(
         "output_dir": str(bronze_dir),
         "force_overwrite": force,
     }
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(jobs or min(len(EXPECTED_FILES), cpus), len(EXPECTED_FILES)))
+    # Multi-threaded CSV parsing only pays off when CPUs are left over after
+    # one per file in flight; otherwise each file parses on its own worker.
+    use_threads = workers < cpus
 
     file_reports: list[BronzeFileReport] = []
     overall_status = "ok"
@@ -157,69 +279,32 @@ def run(
                 )
             )
     else:
-        for name in EXPECTED_FILES:
-            csv_path = raw_extracted / name
-            parquet_path = bronze_dir / name.replace(".csv", ".parquet")
-
-            if not csv_path.exists():
-                overall_status = "partial"
-                file_reports.append(
-                    BronzeFileReport(
-                        name=name,
-                        status="missing",
-                        csv_path=str(csv_path),
-                        parquet_path=None,
-                        rows=None,
-                        csv_bytes=None,
-                        parquet_bytes=None,
-                        csv_sha256=None,
-                        parquet_sha256=None,
-                    )
-                )
-                continue
-
-            if parquet_path.exists() and not force:
-                rows = pq.read_metadata(parquet_path).num_rows
-                file_reports.append(
-                    BronzeFileReport(
-                        name=name,
-                        status="exists",
-                        csv_path=str(csv_path),
-                        parquet_path=str(parquet_path),
-                        rows=rows,
-                        csv_bytes=csv_path.stat().st_size,
-                        parquet_bytes=parquet_path.stat().st_size,
-                        csv_sha256=sha256_file(csv_path),
-                        parquet_sha256=sha256_file(parquet_path),
-                    )
-                )
-                continue
-
-            logger.info("Bronze: %s -> %s", csv_path.name, parquet_path.name)
-            rows = csv_to_parquet_stream(csv_path, parquet_path)
-
-            file_reports.append(
-                BronzeFileReport(
-                    name=name,
-                    status="ok",
-                    csv_path=str(csv_path),
-                    parquet_path=str(parquet_path),
-                    rows=rows,
-                    csv_bytes=csv_path.stat().st_size,
-                    parquet_bytes=parquet_path.stat().st_size,
-                    csv_sha256=sha256_file(csv_path),
-                    parquet_sha256=sha256_file(parquet_path),
+        # Files are independent end to end (convert, stat, hash); pyarrow and
+        # hashlib both release the GIL, so run whole files concurrently.
+        # ex.map keeps the report in EXPECTED_FILES order.
+        notes["jobs"] = workers
+        notes["csv_use_threads"] = use_threads
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            file_reports = list(
+                ex.map(
+                    lambda name: _process_one(
+                        name, raw_extracted, bronze_dir, force=force, use_threads=use_threads
+                    ),
+                    EXPECTED_FILES,
                 )
             )
 
-    finished = datetime.now(timezone.utc)
+        if any(fr.status == "missing" for fr in file_reports):
+            overall_status = "partial"
+
+    finished = utc_now_iso()
 
     report = BronzeReport(
         pipeline="bronze_m5",
         dataset_id=DATASET_ID,
         status=overall_status,
-        started_at_utc=started.isoformat(),
-        finished_at_utc=finished.isoformat(),
+        started_at_utc=started,
+        finished_at_utc=finished,
         config_path=str(cfg["config_path"]),
         raw_extracted_dir=str(raw_extracted),
         bronze_dir=str(bronze_dir),
@@ -228,7 +313,7 @@ def run(
         notes=notes,
     )
 
-    report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    write_json(report_path, report)
 
     if overall_status != "ok" and strict:
         raise FileNotFoundError(notes.get("missing_reason", "Bronze pipeline failed."))
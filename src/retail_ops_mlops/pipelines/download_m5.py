@@ -1,14 +1,12 @@
 from __future__ import annotations
 
-import hashlib
-import json
 import logging
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from retail_ops_mlops.utils.config import ensure_dirs, load_config
+from retail_ops_mlops.utils.config import ensure_dirs, load_config, utc_now_iso, write_json
+from retail_ops_mlops.utils.hashing import cached_sha256
 
 logger = logging.getLogger(__name__)
 
@@ -33,14 +31,6 @@ class DownloadReport:
     notes: dict[str, Any]
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def _resolve_zip(raw_dir: Path, competition: str) -> Path | None:
     expected = raw_dir / f"{competition}.zip"
     if expected.exists():
@@ -67,6 +57,7 @@ def _get_kaggle_api() -> Any:
 def run(
     config_path: str | Path = "configs/default.yaml",
     *,
+    cfg: dict[str, Any] | None = None,
     competition: str = DEFAULT_COMPETITION,
     force: bool = False,
     strict: bool = True,
@@ -78,10 +69,11 @@ def run(
     - download_m5 = network/auth step (external dependency)
     - ingest_m5    = unzip + record metadata (pure local + reproducible)
     """
-    cfg = load_config(config_path)
+    if cfg is None:
+        cfg = load_config(config_path)
     ensure_dirs(cfg)
 
-    started = datetime.now(timezone.utc)
+    started = utc_now_iso()
 
     raw_dir = cfg["paths"]["data_raw"] / DATASET_ID
     raw_dir.mkdir(parents=True, exist_ok=True)
@@ -128,18 +120,21 @@ def run(
             status = "missing_output"
         notes["missing_reason"] = "No zip found in data/raw/m5 after download."
 
-    zip_bytes = zip_path.stat().st_size if zip_path and zip_path.exists() else None
-    zip_sha256 = sha256_file(zip_path) if zip_path and zip_path.exists() else None
+    # The digest is memoized in a sidecar next to the zip, so "exists" reruns and
+    # the ingest step that follows don't hash a multi-GB archive again.
+    zip_st = zip_path.stat() if zip_path and zip_path.exists() else None
+    zip_bytes = zip_st.st_size if zip_st else None
+    zip_sha256 = cached_sha256(zip_path, raw_dir, zip_st) if zip_st else None
 
-    finished = datetime.now(timezone.utc)
+    finished = utc_now_iso()
 
     report = DownloadReport(
         pipeline="download_m5",
         dataset_id=DATASET_ID,
         competition=competition,
         status=status,
-        started_at_utc=started.isoformat(),
-        finished_at_utc=finished.isoformat(),
+        started_at_utc=started,
+        finished_at_utc=finished,
         config_path=str(cfg["config_path"]),
         raw_dir=str(raw_dir),
         zip_path=str(zip_path) if zip_path else None,
@@ -149,7 +144,7 @@ def run(
         notes=notes,
     )
 
-    report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    write_json(report_path, report)
 
     if status not in ("ok", "exists") and strict:
         raise RuntimeError(notes.get("tip_if_403", "Download failed."))
@@ -1,17 +1,12 @@
 from __future__ import annotations
 
-import json
-from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
-from retail_ops_mlops.utils.config import load_cfg
-
-
-def _utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+from retail_ops_mlops.utils.config import load_cfg, utc_now_iso, write_json
 
 
 def _fail(msg: str) -> None:
@@ -35,23 +30,38 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
     if report_path.exists() and (not force):
         raise FileExistsError(f"Exists: {report_path}. Use --force to overwrite.")
 
-    started = _utc_now()
-    df = pd.read_parquet(features_path)
+    started = utc_now_iso()
 
-    # --- required columns
-    req = {"id", "d", "sales", "d_num", "is_test"}
-    missing = req - set(df.columns)
-    if missing:
-        _fail(f"Missing required columns in {features_path}: {sorted(missing)}")
-
-    # --- basic sanity
-    if df.empty:
-        _fail("DQ fail: features table is empty.")
+    # Schema/row-count checks come from the Parquet footer; only the columns the
+    # checks below actually scan are read.
+    feat_cols = ["lag_1", "lag_7", "lag_28", "roll_mean_7", "roll_mean_28"]
+    with pq.ParquetFile(features_path, pre_buffer=True) as pf:
+        meta = pf.metadata
+        columns = set(meta.schema.names)
+
+        # --- required columns
+        req = {"id", "d", "sales", "d_num", "is_test"}
+        missing = req - columns
+        if missing:
+            _fail(f"Missing required columns in {features_path}: {sorted(missing)}")
+        for c in feat_cols:
+            if c not in columns:
+                _fail(f"Missing engineered feature column '{c}' in features table.")
+
+        # --- basic sanity
+        if meta.num_rows == 0:
+            _fail("DQ fail: features table is empty.")
+
+        # Checks run on Arrow columns directly; nothing here needs a pandas frame.
+        t = pf.read(columns=["id", "is_test", *feat_cols])
+    # unique() works on dictionary ids without decoding them (it unifies the
+    # per-chunk dictionaries), so this is O(distinct ids), not O(rows) strings.
+    ids = pc.unique(t["id"])
 
     # --- is_test split size check: expected = n_series * horizon
     h = int(horizon)
-    n_series = int(df["id"].nunique())
-    n_test = int(df["is_test"].sum())
+    n_series = len(ids) - ids.null_count
+    n_test = int(pc.sum(t["is_test"]).as_py() or 0)
     expected_test = n_series * h
 
     if n_test != expected_test:
@@ -62,12 +72,12 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
         )
 
     # --- engineered feature NaNs should be 0 in TEST
-    feat_cols = ["lag_1", "lag_7", "lag_28", "roll_mean_7", "roll_mean_28"]
-    for c in feat_cols:
-        if c not in df.columns:
-            _fail(f"Missing engineered feature column '{c}' in features table.")
-
-    test_na = df.loc[df["is_test"], feat_cols].isna().sum().to_dict()
+    # AND the null mask with is_test instead of materializing the filtered rows.
+    is_test = t["is_test"]
+    test_na = {
+        c: int(pc.sum(pc.and_(pc.is_null(t[c], nan_is_null=True), is_test)).as_py() or 0)
+        for c in feat_cols
+    }
     if any(int(v) > 0 for v in test_na.values()):
         _fail(f"NaNs found in TEST engineered features: {test_na}")
 
@@ -77,10 +87,10 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
         "dataset_id": "m5",
         "status": "ok",
         "started_at_utc": started,
-        "finished_at_utc": _utc_now(),
+        "finished_at_utc": utc_now_iso(),
         "config_path": str(config_path),
         "features_path": str(features_path),
-        "n_rows": int(df.shape[0]),
+        "n_rows": int(meta.num_rows),
         "n_series": n_series,
         "horizon": h,
         "n_test": n_test,
@@ -89,6 +99,6 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
         "notes": {"force_overwrite": bool(force)},
     }
 
-    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    write_json(report_path, report)
     print(f"OK: wrote report: {report_path}")
     return report_path
@@ -1,25 +1,32 @@
 from __future__ import annotations
 
-import json
-from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
 import joblib
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-
-from retail_ops_mlops.utils.config import load_cfg
-
-
-def _utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
-
-def _rmse(y_true, y_pred) -> float:
-    # Robust across sklearn versions: avoid squared=False incompatibilities
-    return float(mean_squared_error(y_true, y_pred) ** 0.5)
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from matplotlib.figure import Figure
+
+from retail_ops_mlops.pipelines.train_m5 import MODEL_FILENAMES
+from retail_ops_mlops.utils.config import load_cfg, utc_now_iso, write_json
+
+
+def _metrics(y_true: np.ndarray, resid: np.ndarray) -> dict[str, float]:
+    # MAE/RMSE/R2 from one residual vector (same definitions as sklearn.metrics,
+    # without three separate passes over y_true/y_pred). Inputs may be float32;
+    # the reductions accumulate in float64.
+    sq = float(np.square(resid).sum(dtype=np.float64))
+    ss_tot = float(np.square(y_true - y_true.mean(dtype=np.float64)).sum(dtype=np.float64))
+    return {
+        "mae": float(np.abs(resid).mean(dtype=np.float64)),
+        "rmse": float(np.sqrt(sq / resid.size)),
+        # sklearn's force_finite convention for a constant y_true
+        "r2": 1.0 - sq / ss_tot if ss_tot else float(sq == 0.0),
+    }
 
 
 def _write_metrics_table(metrics: dict[str, float], csv_path: Path, tex_path: Path) -> None:
@@ -27,19 +34,22 @@ def _write_metrics_table(metrics: dict[str, float], csv_path: Path, tex_path: Pa
     dfm = pd.DataFrame(rows)
     dfm.to_csv(csv_path, index=False)
 
-    lines = []
-    lines.append(r"\begin{tabular}{lr}")
-    lines.append(r"\hline")
-    lines.append(r"Metric & Value \\")
-    lines.append(r"\hline")
-    for r in rows:
-        lines.append(f"{r['metric']} & {r['value']:.6g} \\\\")
-    lines.append(r"\hline")
-    lines.append(r"\end{tabular}")
-    tex_path.write_text("\n".join(lines), encoding="utf-8")
+    # \hline rules instead of the booktabs ones Styler emits by default.
+    styler = (
+        dfm.rename(columns=str.title)
+        .style.hide(axis="index")
+        .format({"Value": "{:.6g}"})
+        .set_table_styles(
+            [{"selector": r, "props": ":hline;"} for r in ("toprule", "midrule", "bottomrule")]
+        )
+    )
+    styler.to_latex(buf=tex_path, column_format="lr", encoding="utf-8")
+
 
+def run(config_path: Path, horizon: int = 28, force: bool = False, model: str = "ridge") -> Path:
+    if model not in MODEL_FILENAMES:
+        raise ValueError(f"Unknown model {model!r}; expected one of {sorted(MODEL_FILENAMES)}")
 
-def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
     cfg = load_cfg(config_path)
     paths = cfg.get("paths", {})
 
@@ -60,7 +70,7 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
     if not features_path.exists():
         raise FileNotFoundError(f"Missing features table: {features_path}. Create it first.")
 
-    model_path = outputs_models / "m5_ridge_baseline.joblib"
+    model_path = outputs_models / MODEL_FILENAMES[model]
     if not model_path.exists():
         raise FileNotFoundError(f"Missing model: {model_path}. Run train-m5 first.")
 
@@ -87,11 +97,12 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
         if p.exists() and not force:
             raise FileExistsError(f"Exists: {p}. Use --force to overwrite.")
 
-    started = _utc_now()
-    df = pd.read_parquet(features_path)
+    started = utc_now_iso()
+    meta = pq.read_metadata(features_path)
+    columns = set(meta.schema.names)
 
     req = {"id", "d", "sales", "d_num", "is_test"}
-    missing = req - set(df.columns)
+    missing = req - columns
     if missing:
         raise ValueError(f"Missing required columns in {features_path}: {sorted(missing)}")
 
@@ -114,52 +125,87 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
     feat_cols = feat_cols_num + feat_cols_cat
 
     for c in feat_cols:
-        if c not in df.columns:
+        if c not in columns:
             raise ValueError(f"Missing feature column '{c}' in {features_path}.")
 
-    test_df = df[df["is_test"]].copy()
-    test_df = test_df.dropna(subset=["lag_1", "lag_7", "lag_28", "roll_mean_7", "roll_mean_28"])
+    # Only decode what the model and the predictions table use, and only TEST
+    # rows: the is_test predicate is pushed into the Parquet scan, so train rows
+    # are never materialized in pandas. Categorical features arrive as pandas
+    # categoricals (int codes + one string per level) instead of a Python str
+    # per row; the one-hot encoder sees the same values either way.
+    needed = sorted(req | set(feat_cols))
+    test_df = pd.read_parquet(
+        features_path,
+        columns=needed,
+        filters=[("is_test", "==", True)],
+        read_dictionary=feat_cols_cat,
+        pre_buffer=True,
+    )
+    # One NumPy mask over the lag columns; the frame is only copied when some
+    # test rows actually have NaN lags (dropna copies unconditionally).
+    keep = np.logical_and.reduce(
+        [
+            test_df[c].notna().to_numpy()
+            for c in ("lag_1", "lag_7", "lag_28", "roll_mean_7", "roll_mean_28")
+        ]
+    )
+    if not keep.all():
+        test_df = test_df[keep]
     if test_df.empty:
         raise ValueError(
             "After dropping NaNs, test_df became empty. Check feature builder + horizon."
         )
 
     X_test = test_df[feat_cols]
-    y_true = test_df["sales"].astype(float).values
+    # float32 is exact for unit sales and ample for the metrics/plots; it halves
+    # the bytes every reduction below streams through. The predictions CSV keeps
+    # the model's full-precision output.
+    y_true = test_df["sales"].to_numpy(dtype=np.float32)
 
     pipe = joblib.load(model_path)
-    y_pred = pipe.predict(X_test)
-
-    metrics = {
-        "mae": float(mean_absolute_error(y_true, y_pred)),
-        "rmse": _rmse(y_true, y_pred),
-        "r2": float(r2_score(y_true, y_pred)),
-    }
-
-    out = test_df[["id", "d", "sales"]].copy().rename(columns={"sales": "y_true"})
-    out["y_pred"] = y_pred
-    out.to_csv(preds_csv, index=False)
-
-    plt.figure()
-    plt.scatter(out["y_true"], out["y_pred"], s=10)
-    plt.xlabel("y_true")
-    plt.ylabel("y_pred")
-    plt.title("M5 baseline: Pred vs True")
-    plt.tight_layout()
-    plt.savefig(fig_pred_pdf)
-    plt.savefig(fig_pred_png)
-    plt.close()
-
-    resid = out["y_true"] - out["y_pred"]
-    plt.figure()
-    plt.hist(resid, bins=50)
-    plt.xlabel("residual (y_true - y_pred)")
-    plt.ylabel("count")
-    plt.title("M5 baseline: Residuals")
-    plt.tight_layout()
-    plt.savefig(fig_res_pdf)
-    plt.savefig(fig_res_png)
-    plt.close()
+    y_pred_full = pipe.predict(X_test)
+    y_pred = y_pred_full.astype(np.float32)
+    resid = y_true - y_pred
+
+    metrics = _metrics(y_true, resid)
+
+    # Arrow's CSV writer formats in C++ (DataFrame.to_csv goes through Python
+    # per value). The text differs from to_csv: header and string cells are
+    # double-quoted, and floats print in shortest round-trip form ("10",
+    # "0.00001" where to_csv wrote "10.0", "1e-05"). Values parse back the
+    # same; "needed" quoting keeps any id with a comma/quote/newline valid.
+    out = pa.table(
+        {
+            "id": pa.array(test_df["id"]),
+            "d": pa.array(test_df["d"]),
+            "y_true": pa.array(test_df["sales"]),
+            "y_pred": pa.array(y_pred_full),
+        }
+    )
+    pacsv.write_csv(out, preds_csv, pacsv.WriteOptions(quoting_style="needed"))
+
+    # Object-oriented Figure API: no pyplot state and no GUI backend, the
+    # canvas is picked per output format. The scatter is rasterized so the PDF
+    # holds one image instead of one vector path per point; axes/text stay vector.
+    fig = Figure()
+    ax = fig.subplots()
+    ax.scatter(y_true, y_pred, s=10, rasterized=True)
+    ax.set_xlabel("y_true")
+    ax.set_ylabel("y_pred")
+    ax.set_title("M5 baseline: Pred vs True")
+    fig.tight_layout()
+    fig.savefig(fig_pred_pdf, dpi=150)
+    fig.savefig(fig_pred_png)
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.hist(resid, bins=50)
+    ax.set_xlabel("residual (y_true - y_pred)")
+    ax.set_ylabel("count")
+    ax.set_title("M5 baseline: Residuals")
+    fig.tight_layout()
+    fig.savefig(fig_res_pdf)
+    fig.savefig(fig_res_png)
 
     _write_metrics_table(metrics, metrics_csv, metrics_tex)
 
@@ -168,9 +214,10 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
         "dataset_id": "m5",
         "status": "ok",
         "started_at_utc": started,
-        "finished_at_utc": _utc_now(),
+        "finished_at_utc": utc_now_iso(),
         "config_path": str(config_path),
         "features_path": str(features_path),
+        "model": model,
         "model_path": str(model_path),
         "report_path": str(report_path),
         "metrics_path_csv": str(metrics_csv),
@@ -182,13 +229,13 @@ def run(config_path: Path, horizon: int = 28, force: bool = False) -> Path:
             "residuals_pdf": str(fig_res_pdf),
             "residuals_png": str(fig_res_png),
         },
-        "n_rows": int(df.shape[0]),
+        "n_rows": int(meta.num_rows),
         "n_test": int(test_df.shape[0]),
         "horizon": int(horizon),
         "metrics": metrics,
         "notes": {"force_overwrite": bool(force), "cwd_root": str(root)},
     }
 
-    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    write_json(report_path, report)
     print(f"OK: wrote report: {report_path}")
     return report_path
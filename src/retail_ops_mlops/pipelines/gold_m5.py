@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-import hashlib
-import json
 import logging
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
@@ -13,12 +12,19 @@ import pyarrow as pa
 import pyarrow.compute as pc
 import pyarrow.parquet as pq
 
-from retail_ops_mlops.utils.config import ensure_dirs, load_config
+from retail_ops_mlops.utils.config import ensure_dirs, load_config, utc_now_iso, write_json
+from retail_ops_mlops.utils.hashing import cached_sha256
 
 logger = logging.getLogger(__name__)
 
 DATASET_ID = "m5"
 
+# Default rows per row group for gold tables.
+GOLD_ROWS_PER_GROUP = 256_000
+
+# Target rows per row group in fact_sales_long_sample (rounded down to whole series).
+SAMPLE_ROWS_PER_GROUP = 1 << 20
+
 REQUIRED_SILVER = (
     "calendar.parquet",
     "sell_prices.parquet",
@@ -55,25 +61,51 @@ class GoldReport:
     notes: dict[str, Any]
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
+def _write_parquet(
+    table: pa.Table, out_path: Path, *, row_group_size: int = GOLD_ROWS_PER_GROUP
+) -> None:
+    """
+    Write `table` straight to `out_path` from Arrow's C++ writer.
 
-def _write_parquet(table: pa.Table, out_path: Path) -> None:
+    No Python-level hashing sink: the stages write in parallel, and per-page
+    Python calls would contend for the GIL. _file_report hashes the finished
+    file with cached_sha256 (hashlib releases the GIL).
+    """
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    pq.write_table(table, out_path, compression="snappy")
+    # Gold tables are small and highly repetitive (weekday/event/id strings):
+    # dictionary pages + zstd give much smaller files than snappy at similar
+    # write cost, which also shortens every later read and digest.
+    pq.write_table(
+        table,
+        out_path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=True,
+        row_group_size=row_group_size,
+        data_page_size=1 << 20,
+    )
 
 
 def _calendar_gold(in_path: Path) -> pa.Table:
     tbl = pq.read_table(in_path)
 
     weekend_set = pa.array(["Saturday", "Sunday"], type=pa.string())
-    is_weekend = pc.is_in(tbl["weekday"], value_set=weekend_set)
-    is_event_day = pc.invert(pc.is_null(tbl["event_name_1"]))
+    weekday = tbl["weekday"]
+    if pa.types.is_dictionary(weekday.type):
+        # Test the (7-entry) dictionary once and gather the answer by index.
+        is_weekend = pa.chunked_array(
+            [
+                pc.take(pc.is_in(ch.dictionary, value_set=weekend_set), ch.indices)
+                for ch in weekday.chunks
+            ],
+            type=pa.bool_(),
+        ).fill_null(False)
+    else:
+        is_weekend = pc.is_in(weekday, value_set=weekend_set)
+    # Bronze keeps the CSV's empty event fields as "" (not null): an event day
+    # is one with a non-empty event_name_1.
+    event = tbl["event_name_1"].cast(pa.string())
+    is_event_day = pc.fill_null(pc.not_equal(event, ""), False)
 
     tbl = tbl.append_column("is_weekend", is_weekend)
     tbl = tbl.append_column("is_event_day", is_event_day)
@@ -82,11 +114,28 @@ def _calendar_gold(in_path: Path) -> pa.Table:
 
 def _series_dim_from_sales_validation(in_path: Path) -> pa.Table:
     cols = ["id", "item_id", "dept_id", "cat_id", "store_id", "state_id"]
-    tbl = pq.read_table(in_path, columns=cols)
+    # Six narrow columns out of ~1900: pre_buffer coalesces their chunk reads
+    # and memory_map avoids a userspace copy of the bytes.
+    tbl = pq.read_table(in_path, columns=cols, use_threads=True, pre_buffer=True, memory_map=True)
+
+    # Silver's dictionary columns are decoded so the dimension holds plain strings.
+    tbl = pa.table(
+        {
+            c: tbl[c].cast(tbl[c].type.value_type)
+            if pa.types.is_dictionary(tbl[c].type)
+            else tbl[c]
+            for c in cols
+        }
+    )
 
-    # Small table (~30k rows) => pandas is fine for uniqueness
-    df = tbl.to_pandas().drop_duplicates()
-    return pa.Table.from_pandas(df, preserve_index=False)
+    # `id` is "<item_id>_<store_id>_validation", so it determines the other
+    # columns and deduping on it alone matches drop_duplicates(). Sales rows are
+    # normally one per series already; otherwise keep each id's first row.
+    ids = tbl["id"]
+    uniq_ids = pc.unique(ids)
+    if len(uniq_ids) == tbl.num_rows:
+        return tbl
+    return tbl.take(pc.index_in(uniq_ids, value_set=ids))
 
 
 def _sorted_day_cols(schema_names: list[str]) -> list[str]:
@@ -109,42 +158,219 @@ def _sales_long_sample(
     if not day_cols_all:
         raise ValueError("No day columns (d_*) found in sales_train_validation.parquet")
 
+    if sample_n_series <= 0 or sample_days <= 0:
+        # Empty sample: skip the data read (and note that [-0:] would select
+        # every day rather than none).
+        fields = []
+        for c in meta_cols:
+            t = schema.field(c).type
+            fields.append(pa.field(c, t.value_type if pa.types.is_dictionary(t) else t))
+        fields += [pa.field("d", pa.string()), pa.field("sales", pa.int32())]
+        return pa.schema(fields).empty_table()
+
     day_cols = day_cols_all[-min(sample_days, len(day_cols_all)) :]
 
-    pf = pq.ParquetFile(sales_validation_path)
+    # pre_buffer coalesces the per-column chunk reads of this very wide table
+    # into a few large ones; batches are sized to the sample itself so only the
+    # rows we keep are decoded into Arrow. The sample is the head of the file,
+    # so only the leading row groups that cover it are read at all.
+    pf = pq.ParquetFile(sales_validation_path, pre_buffer=True)
     cols = meta_cols + day_cols
 
+    row_groups: list[int] = []
+    covered = 0
+    for i in range(pf.metadata.num_row_groups):
+        row_groups.append(i)
+        covered += pf.metadata.row_group(i).num_rows
+        if covered >= sample_n_series:
+            break
+
     batches: list[pa.RecordBatch] = []
     seen = 0
-    for batch in pf.iter_batches(batch_size=max(1024, sample_n_series), columns=cols):
+    for batch in pf.iter_batches(
+        batch_size=max(1, sample_n_series), row_groups=row_groups, columns=cols
+    ):
+        # Keep exactly the rows still needed and stop reading once covered.
+        batch = batch.slice(0, sample_n_series - seen)
         batches.append(batch)
         seen += batch.num_rows
         if seen >= sample_n_series:
             break
 
-    wide = pa.Table.from_batches(batches).slice(0, sample_n_series)
+    schema = pa.schema([pf.schema_arrow.field(c) for c in cols])
+    wide = pa.Table.from_batches(batches, schema=schema)
 
     n_series = wide.num_rows
     n_days = len(day_cols)
 
+    # Long layout via Arrow take() on integer indices: metadata strings are
+    # gathered in C++ rather than materialized as Python objects.
     out: dict[str, Any] = {}
+    row_idx = pa.array(np.repeat(np.arange(n_series, dtype=np.int32), n_days))
     for c in meta_cols:
-        out[c] = np.repeat(wide[c].to_pylist(), n_days)
+        col = wide[c].combine_chunks()
+        if pa.types.is_dictionary(col.type):
+            col = col.dictionary_decode()
+        out[c] = col.take(row_idx)
+
+    day_idx = pa.array(np.tile(np.arange(n_days, dtype=np.int32), n_series))
+    out["d"] = pa.array(day_cols, type=pa.string()).take(day_idx)
+
+    # One Arrow->NumPy conversion for all day columns: to_tensor(row_major=True)
+    # lays the (n_series, n_days) int32 matrix out series-major in C++, so the
+    # flatten below is a view.
+    days = wide.select(day_cols).cast(pa.schema([(c, pa.int32()) for c in day_cols]))
+    day_batches = days.combine_chunks().to_batches()
+    if day_batches:
+        sales = np.asarray(day_batches[0].to_tensor(row_major=True))
+    else:
+        sales = np.empty((0, n_days), dtype=np.int32)
+    out["sales"] = sales.reshape(-1)
+
+    return pa.Table.from_pydict(out)
 
-    out["d"] = np.tile(day_cols, n_series)
 
-    day_matrix = np.stack(
-        [wide[c].to_numpy(zero_copy_only=False) for c in day_cols],
-        axis=1,
+def _file_report(
+    status: str,
+    in_path: Path,
+    out_path: Path,
+    rows: int,
+    columns: int,
+    *,
+    input_sha256: Future[str],
+    output_sha256: str | None = None,
+) -> GoldFileReport:
+    # One stat per file feeds both the byte counts and the digest cache key.
+    # The input digest is computed once per input in run(): two stages share
+    # the sales file, and a cold cache must not hash it twice.
+    in_st = in_path.stat()
+    out_st = out_path.stat()
+    return GoldFileReport(
+        name=out_path.name,
+        status=status,
+        input_path=str(in_path),
+        output_path=str(out_path),
+        rows=rows,
+        columns=columns,
+        input_bytes=in_st.st_size,
+        output_bytes=out_st.st_size,
+        input_sha256=input_sha256.result(),
+        output_sha256=output_sha256 or cached_sha256(out_path, st=out_st),
     )
-    out["sales"] = day_matrix.reshape(-1).astype(np.int32, copy=False)
 
-    return pa.Table.from_pydict(out)
+
+def _existing_report(in_path: Path, out_path: Path, *, input_sha256: Future[str]) -> GoldFileReport:
+    # One footer parse gives both the row count and the schema.
+    pf = pq.ParquetFile(out_path)
+    return _file_report(
+        "exists",
+        in_path,
+        out_path,
+        pf.metadata.num_rows,
+        len(pf.schema_arrow.names),
+        input_sha256=input_sha256,
+    )
+
+
+def _stage_calendar(
+    in_path: Path, out_path: Path, *, force: bool, input_sha256: Future[str]
+) -> GoldFileReport:
+    if out_path.exists() and not force:
+        return _existing_report(in_path, out_path, input_sha256=input_sha256)
+    logger.info("Gold: %s -> %s", in_path.name, out_path.name)
+    cal = _calendar_gold(in_path)
+    _write_parquet(cal, out_path)
+    return _file_report(
+        "ok",
+        in_path,
+        out_path,
+        cal.num_rows,
+        cal.num_columns,
+        input_sha256=input_sha256,
+    )
+
+
+def _stage_series(
+    in_path: Path, out_path: Path, *, force: bool, input_sha256: Future[str]
+) -> GoldFileReport:
+    if out_path.exists() and not force:
+        return _existing_report(in_path, out_path, input_sha256=input_sha256)
+    logger.info("Gold: %s -> %s", in_path.name, out_path.name)
+    series = _series_dim_from_sales_validation(in_path)
+    _write_parquet(series, out_path)
+    return _file_report(
+        "ok",
+        in_path,
+        out_path,
+        series.num_rows,
+        series.num_columns,
+        input_sha256=input_sha256,
+    )
+
+
+def _stage_prices(
+    in_path: Path, out_path: Path, *, force: bool, input_sha256: Future[str]
+) -> GoldFileReport:
+    # fact_sell_prices (copied/kept typed)
+    if out_path.exists() and not force:
+        return _existing_report(in_path, out_path, input_sha256=input_sha256)
+    logger.info("Gold: %s -> %s", in_path.name, out_path.name)
+    # Pure passthrough: copy the bytes (sendfile/copy_file_range) rather than
+    # decoding and re-encoding the table. Rows/columns come from the footer and
+    # the output digest is the input's.
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(in_path, out_path)
+    meta = pq.read_metadata(out_path)
+    return _file_report(
+        "ok",
+        in_path,
+        out_path,
+        meta.num_rows,
+        meta.num_columns,
+        input_sha256=input_sha256,
+        output_sha256=input_sha256.result(),
+    )
+
+
+def _stage_sample(
+    in_path: Path,
+    out_path: Path,
+    *,
+    force: bool,
+    input_sha256: Future[str],
+    sample_n_series: int,
+    sample_days: int,
+) -> GoldFileReport:
+    # small long-format sample (for EDA/debug)
+    if out_path.exists() and not force:
+        return _existing_report(in_path, out_path, input_sha256=input_sha256)
+    logger.info("Gold: building sales long sample -> %s", out_path.name)
+    sample = _sales_long_sample(
+        in_path,
+        sample_n_series=sample_n_series,
+        sample_days=sample_days,
+    )
+    # Row groups hold whole series so build-features can stream them one by one.
+    n_days = max(1, pc.count_distinct(sample["d"]).as_py())
+    _write_parquet(
+        sample,
+        out_path,
+        row_group_size=n_days * max(1, SAMPLE_ROWS_PER_GROUP // n_days),
+    )
+    return _file_report(
+        "ok",
+        in_path,
+        out_path,
+        sample.num_rows,
+        sample.num_columns,
+        input_sha256=input_sha256,
+    )
 
 
 def run(
     config_path: str | Path = "configs/default.yaml",
     *,
+    cfg: dict[str, Any] | None = None,
     force: bool = False,
     strict: bool = True,
     sample_n_series: int = 20,
@@ -158,10 +384,11 @@ def run(
     - fact_sales_long_sample.parquet (small long-format sample for EDA/debug)
     - Report: outputs/reports/gold_m5.json
     """
-    cfg = load_config(config_path)
+    if cfg is None:
+        cfg = load_config(config_path)
     ensure_dirs(cfg)
 
-    started = datetime.now(timezone.utc)
+    started = utc_now_iso()
 
     silver_dir = cfg["paths"]["data_processed"] / DATASET_ID / "silver"
     gold_dir = cfg["paths"]["data_processed"] / DATASET_ID / "gold"
@@ -183,14 +410,14 @@ def run(
     if not silver_dir.exists():
         status = "missing_input"
         notes["missing_reason"] = "Silver dir not found. Run silver-m5 first."
-        finished = datetime.now(timezone.utc)
+        finished = utc_now_iso()
 
         report = GoldReport(
             pipeline="gold_m5",
             dataset_id=DATASET_ID,
             status=status,
-            started_at_utc=started.isoformat(),
-            finished_at_utc=finished.isoformat(),
+            started_at_utc=started,
+            finished_at_utc=finished,
             config_path=str(cfg["config_path"]),
             silver_dir=str(silver_dir),
             gold_dir=str(gold_dir),
@@ -198,7 +425,7 @@ def run(
             files=files,
             notes=notes,
         )
-        report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+        write_json(report_path, report)
         if strict:
             raise FileNotFoundError(notes["missing_reason"])
         return report_path
@@ -209,14 +436,14 @@ def run(
         status = "missing_input"
         notes["missing_files"] = missing
         notes["missing_reason"] = "Some required Silver files are missing."
-        finished = datetime.now(timezone.utc)
+        finished = utc_now_iso()
 
         report = GoldReport(
             pipeline="gold_m5",
             dataset_id=DATASET_ID,
             status=status,
-            started_at_utc=started.isoformat(),
-            finished_at_utc=finished.isoformat(),
+            started_at_utc=started,
+            finished_at_utc=finished,
             config_path=str(cfg["config_path"]),
             silver_dir=str(silver_dir),
             gold_dir=str(gold_dir),
@@ -224,181 +451,52 @@ def run(
             files=files,
             notes=notes,
         )
-        report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+        write_json(report_path, report)
         if strict:
             raise FileNotFoundError(notes["missing_reason"])
         return report_path
 
-    # 1) dim_calendar
     in_cal = silver_dir / "calendar.parquet"
-    out_cal = gold_dir / "dim_calendar.parquet"
-
-    if out_cal.exists() and not force:
-        cal_rows = pq.read_metadata(out_cal).num_rows
-        cal_cols = len(pq.read_schema(out_cal).names)
-        files.append(
-            GoldFileReport(
-                name=out_cal.name,
-                status="exists",
-                input_path=str(in_cal),
-                output_path=str(out_cal),
-                rows=cal_rows,
-                columns=cal_cols,
-                input_bytes=in_cal.stat().st_size,
-                output_bytes=out_cal.stat().st_size,
-                input_sha256=sha256_file(in_cal),
-                output_sha256=sha256_file(out_cal),
-            )
-        )
-    else:
-        logger.info("Gold: %s -> %s", in_cal.name, out_cal.name)
-        cal = _calendar_gold(in_cal)
-        _write_parquet(cal, out_cal)
-        files.append(
-            GoldFileReport(
-                name=out_cal.name,
-                status="ok",
-                input_path=str(in_cal),
-                output_path=str(out_cal),
-                rows=cal.num_rows,
-                columns=cal.num_columns,
-                input_bytes=in_cal.stat().st_size,
-                output_bytes=out_cal.stat().st_size,
-                input_sha256=sha256_file(in_cal),
-                output_sha256=sha256_file(out_cal),
-            )
-        )
-
-    # 2) dim_series
     in_sales = silver_dir / "sales_train_validation.parquet"
-    out_series = gold_dir / "dim_series.parquet"
-
-    if out_series.exists() and not force:
-        s_rows = pq.read_metadata(out_series).num_rows
-        s_cols = len(pq.read_schema(out_series).names)
-        files.append(
-            GoldFileReport(
-                name=out_series.name,
-                status="exists",
-                input_path=str(in_sales),
-                output_path=str(out_series),
-                rows=s_rows,
-                columns=s_cols,
-                input_bytes=in_sales.stat().st_size,
-                output_bytes=out_series.stat().st_size,
-                input_sha256=sha256_file(in_sales),
-                output_sha256=sha256_file(out_series),
-            )
-        )
-    else:
-        logger.info("Gold: %s -> %s", in_sales.name, out_series.name)
-        series = _series_dim_from_sales_validation(in_sales)
-        _write_parquet(series, out_series)
-        files.append(
-            GoldFileReport(
-                name=out_series.name,
-                status="ok",
-                input_path=str(in_sales),
-                output_path=str(out_series),
-                rows=series.num_rows,
-                columns=series.num_columns,
-                input_bytes=in_sales.stat().st_size,
-                output_bytes=out_series.stat().st_size,
-                input_sha256=sha256_file(in_sales),
-                output_sha256=sha256_file(out_series),
-            )
-        )
-
-    # 3) fact_sell_prices (copied/kept typed)
     in_prices = silver_dir / "sell_prices.parquet"
-    out_prices = gold_dir / "fact_sell_prices.parquet"
-
-    if out_prices.exists() and not force:
-        p_rows = pq.read_metadata(out_prices).num_rows
-        p_cols = len(pq.read_schema(out_prices).names)
-        files.append(
-            GoldFileReport(
-                name=out_prices.name,
-                status="exists",
-                input_path=str(in_prices),
-                output_path=str(out_prices),
-                rows=p_rows,
-                columns=p_cols,
-                input_bytes=in_prices.stat().st_size,
-                output_bytes=out_prices.stat().st_size,
-                input_sha256=sha256_file(in_prices),
-                output_sha256=sha256_file(out_prices),
-            )
-        )
-    else:
-        logger.info("Gold: %s -> %s", in_prices.name, out_prices.name)
-        prices = pq.read_table(in_prices)
-        _write_parquet(prices, out_prices)
-        files.append(
-            GoldFileReport(
-                name=out_prices.name,
-                status="ok",
-                input_path=str(in_prices),
-                output_path=str(out_prices),
-                rows=prices.num_rows,
-                columns=prices.num_columns,
-                input_bytes=in_prices.stat().st_size,
-                output_bytes=out_prices.stat().st_size,
-                input_sha256=sha256_file(in_prices),
-                output_sha256=sha256_file(out_prices),
-            )
-        )
 
-    # 4) small long-format sample (for EDA/debug)
-    out_sample = gold_dir / "fact_sales_long_sample.parquet"
-    if out_sample.exists() and not force:
-        sm_rows = pq.read_metadata(out_sample).num_rows
-        sm_cols = len(pq.read_schema(out_sample).names)
-        files.append(
-            GoldFileReport(
-                name=out_sample.name,
-                status="exists",
-                input_path=str(in_sales),
-                output_path=str(out_sample),
-                rows=sm_rows,
-                columns=sm_cols,
-                input_bytes=in_sales.stat().st_size,
-                output_bytes=out_sample.stat().st_size,
-                input_sha256=sha256_file(in_sales),
-                output_sha256=sha256_file(out_sample),
-            )
-        )
-    else:
-        logger.info("Gold: building sales long sample -> %s", out_sample.name)
-        sample = _sales_long_sample(
+    # The four outputs are independent; Arrow releases the GIL for Parquet I/O,
+    # compute kernels and hashing, so each stage (write + digests) runs on its
+    # own thread. Report order stays fixed.
+    stages = [
+        (_stage_calendar, in_cal, gold_dir / "dim_calendar.parquet", {}),
+        (_stage_series, in_sales, gold_dir / "dim_series.parquet", {}),
+        (_stage_prices, in_prices, gold_dir / "fact_sell_prices.parquet", {}),
+        (
+            _stage_sample,
             in_sales,
-            sample_n_series=sample_n_series,
-            sample_days=sample_days,
-        )
-        _write_parquet(sample, out_sample)
-        files.append(
-            GoldFileReport(
-                name=out_sample.name,
-                status="ok",
-                input_path=str(in_sales),
-                output_path=str(out_sample),
-                rows=sample.num_rows,
-                columns=sample.num_columns,
-                input_bytes=in_sales.stat().st_size,
-                output_bytes=out_sample.stat().st_size,
-                input_sha256=sha256_file(in_sales),
-                output_sha256=sha256_file(out_sample),
-            )
-        )
-
-    finished = datetime.now(timezone.utc)
+            gold_dir / "fact_sales_long_sample.parquet",
+            {"sample_n_series": sample_n_series, "sample_days": sample_days},
+        ),
+    ]
+    # Each distinct input is hashed exactly once, on its own pool (so a stage
+    # waiting on a digest can never starve the hash of a worker), overlapping
+    # with the stage work; stages only block on it when building their report.
+    inputs = list(dict.fromkeys(in_path for _, in_path, _, _ in stages))
+    with (
+        ThreadPoolExecutor(max_workers=len(inputs)) as hash_ex,
+        ThreadPoolExecutor(max_workers=len(stages)) as ex,
+    ):
+        digests = {p: hash_ex.submit(cached_sha256, p) for p in inputs}
+        futures = [
+            ex.submit(fn, in_path, out_path, force=force, input_sha256=digests[in_path], **kw)
+            for fn, in_path, out_path, kw in stages
+        ]
+        files = [f.result() for f in futures]
+
+    finished = utc_now_iso()
 
     report = GoldReport(
         pipeline="gold_m5",
         dataset_id=DATASET_ID,
         status=status,
-        started_at_utc=started.isoformat(),
-        finished_at_utc=finished.isoformat(),
+        started_at_utc=started,
+        finished_at_utc=finished,
         config_path=str(cfg["config_path"]),
         silver_dir=str(silver_dir),
         gold_dir=str(gold_dir),
@@ -407,7 +505,7 @@ def run(
         notes=notes,
     )
 
-    report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    write_json(report_path, report)
 
     if status != "ok" and strict:
         raise FileNotFoundError(notes.get("missing_reason", "Gold pipeline failed."))
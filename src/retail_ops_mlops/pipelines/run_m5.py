@@ -1,18 +1,21 @@
 from __future__ import annotations
 
+import importlib
 import json
 import logging
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from retail_ops_mlops.utils.config import ensure_dirs, load_config
+from retail_ops_mlops.utils.config import ensure_dirs, load_config, utc_now_iso, write_json
 
 logger = logging.getLogger(__name__)
 
 DATASET_ID = "m5"
 SUCCESS_STATUSES = {"ok", "exists"}
+STAGE_ORDER = ("download_m5", "ingest_m5", "bronze_m5", "silver_m5", "gold_m5")
 
 
 @dataclass
@@ -36,7 +39,22 @@ class RunReport:
     notes: dict[str, Any]
 
 
+# Reports list `status` right after pipeline/dataset_id, so it sits in the first
+# few hundred bytes even when the file itself (e.g. ingest_m5.json) is large.
+_STATUS_RE = re.compile(rb'"status"\s*:\s*"([^"]+)"')
+_STATUS_PREFIX_BYTES = 4096
+
+
 def _read_status(report_path: Path) -> str:
+    try:
+        with report_path.open("rb") as f:
+            head = f.read(_STATUS_PREFIX_BYTES)
+    except OSError:
+        return "unknown"
+    m = _STATUS_RE.search(head)
+    if m is not None:
+        return m.group(1).decode("utf-8")
+
     try:
         data = json.loads(report_path.read_text(encoding="utf-8"))
     except Exception:
@@ -51,53 +69,54 @@ def run(
     zip_path: Path | None = None,
     force: bool = False,
     strict: bool = True,
+    only: Iterable[str] | None = None,
 ) -> Path:
     """
     Run full M5 pipeline in order:
       download -> ingest -> bronze -> silver -> gold
 
+    `only` restricts the run to the named stages (e.g. {"gold_m5"}), still in
+    pipeline order; only their modules are imported.
+
     Design:
     - Stage pipelines run with strict=False so they always write their own report.
     - This orchestrator stops at first failure, writes run_m5.json, and raises if strict=True.
+    - The config is parsed once here and handed to every stage.
     """
+    if only is not None:
+        only = set(only)
+        unknown = only.difference(STAGE_ORDER)
+        if unknown:
+            raise ValueError(f"Unknown run_m5 stages: {sorted(unknown)}; expected {STAGE_ORDER}")
+
     cfg = load_config(config_path)
     ensure_dirs(cfg)
 
-    started = datetime.now(timezone.utc)
+    started = utc_now_iso()
     report_path = cfg["paths"]["outputs_reports"] / "run_m5.json"
 
+    stage_kwargs: dict[str, dict[str, Any]] = {
+        "download_m5": {"force": force},
+        "ingest_m5": {"zip_path": zip_path},
+        "bronze_m5": {"force": force},
+        "silver_m5": {"force": force},
+        "gold_m5": {"force": force},
+    }
+    selected = list(STAGE_ORDER) if only is None else [s for s in STAGE_ORDER if s in only]
+
     notes: dict[str, Any] = {
         "stop_on_first_failure": True,
         "force_overwrite": force,
         "zip_path": str(zip_path) if zip_path else None,
         "success_statuses": sorted(SUCCESS_STATUSES),
-        "stage_order": [
-            "download_m5",
-            "ingest_m5",
-            "bronze_m5",
-            "silver_m5",
-            "gold_m5",
-        ],
+        "stage_order": selected,
     }
 
-    from retail_ops_mlops.pipelines.bronze_m5 import run as bronze_run
-    from retail_ops_mlops.pipelines.download_m5 import run as download_run
-    from retail_ops_mlops.pipelines.gold_m5 import run as gold_run
-    from retail_ops_mlops.pipelines.ingest_m5 import run as ingest_run
-    from retail_ops_mlops.pipelines.silver_m5 import run as silver_run
-
-    stage_defs: list[tuple[str, Any, dict[str, Any]]] = [
-        ("download_m5", download_run, {"force": force}),
-        ("ingest_m5", ingest_run, {"zip_path": zip_path}),
-        ("bronze_m5", bronze_run, {"force": force}),
-        ("silver_m5", silver_run, {"force": force}),
-        ("gold_m5", gold_run, {"force": force}),
-    ]
-
     stages: list[StageSummary] = []
     failed = False
 
-    for pipeline, fn, kwargs in stage_defs:
+    for pipeline in selected:
+        kwargs = stage_kwargs[pipeline]
         if failed:
             stages.append(
                 StageSummary(
@@ -111,7 +130,9 @@ def run(
 
         logger.info("Run: %s", pipeline)
         try:
-            rp: Path = fn(config_path=config_path, strict=False, **kwargs)
+            # Stage modules pull in pyarrow/pandas; import only the ones we run.
+            fn = importlib.import_module(f"retail_ops_mlops.pipelines.{pipeline}").run
+            rp: Path = fn(config_path=config_path, cfg=cfg, strict=False, **kwargs)
             status = _read_status(rp)
 
             stages.append(
@@ -136,7 +157,7 @@ def run(
             )
             failed = True
 
-    finished = datetime.now(timezone.utc)
+    finished = utc_now_iso()
 
     overall_status = "ok"
     if any(s.status not in SUCCESS_STATUSES for s in stages):
@@ -146,15 +167,15 @@ def run(
         pipeline="run_m5",
         dataset_id=DATASET_ID,
         status=overall_status,
-        started_at_utc=started.isoformat(),
-        finished_at_utc=finished.isoformat(),
+        started_at_utc=started,
+        finished_at_utc=finished,
         config_path=str(cfg["config_path"]),
         report_path=str(report_path),
         stages=stages,
         notes=notes,
     )
 
-    report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    write_json(report_path, report)
 
     if strict and overall_status != "ok":
         raise RuntimeError(f"run_m5 failed; see report: {report_path}")
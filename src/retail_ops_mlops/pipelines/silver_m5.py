@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import hashlib
+import functools
 import json
 import logging
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
@@ -12,7 +13,8 @@ import pyarrow as pa
 import pyarrow.compute as pc
 import pyarrow.parquet as pq
 
-from retail_ops_mlops.utils.config import ensure_dirs, load_config
+from retail_ops_mlops.utils.config import ensure_dirs, load_config, utc_now_iso, write_json
+from retail_ops_mlops.utils.hashing import cached_sha256
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,26 @@ BRONZE_FILES = (
 )
 
 
+SILVER_ROWS_PER_GROUP = 512_000
+
+# Low-cardinality string columns, read (and written) dictionary-encoded so they
+# are never expanded to dense strings, even if a bronze file lacks the stored
+# Arrow schema that normally restores its dictionaries.
+DICT_COLUMNS = (
+    "id",
+    "item_id",
+    "dept_id",
+    "cat_id",
+    "store_id",
+    "state_id",
+    "weekday",
+    "event_name_1",
+    "event_type_1",
+    "event_name_2",
+    "event_type_2",
+)
+
+
 @dataclass
 class SilverFileReport:
     name: str
@@ -41,6 +63,25 @@ class SilverFileReport:
     output_sha256: str | None
 
 
+# Columnar twin of SilverFileReport, written next to silver_m5.json under
+# outputs/reports so per-file facts can be queried (and projected) across runs
+# without parsing JSON.
+REPORT_TABLE_SCHEMA = pa.schema(
+    [
+        ("name", pa.string()),
+        ("status", pa.string()),
+        ("input_path", pa.string()),
+        ("output_path", pa.string()),
+        ("rows", pa.int64()),
+        ("columns", pa.int32()),
+        ("input_bytes", pa.int64()),
+        ("output_bytes", pa.int64()),
+        ("input_sha256", pa.string()),
+        ("output_sha256", pa.string()),
+    ]
+)
+
+
 @dataclass
 class SilverReport:
     pipeline: str
@@ -56,26 +97,26 @@ class SilverReport:
     notes: dict[str, Any]
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
+def _replace_columns(table: pa.Table, updates: dict[str, pa.Array | pa.ChunkedArray]) -> pa.Table:
+    """
+    Swap in new column arrays with one Table construction.
 
-def _set(table: pa.Table, name: str, arr: pa.Array | pa.ChunkedArray) -> pa.Table:
-    if name not in table.column_names:
+    set_column() rebuilds the table and schema per call, which is quadratic on
+    the ~1900-column sales tables; names not in `table` are ignored.
+    """
+    updates = {n: a for n, a in updates.items() if n in table.column_names}
+    if not updates:
         return table
-    idx = table.schema.get_field_index(name)
-    return table.set_column(idx, name, arr)
+    fields = [
+        table.schema.field(n).with_type(updates[n].type) if n in updates else table.schema.field(n)
+        for n in table.column_names
+    ]
+    arrays = [updates.get(n, table[n]) for n in table.column_names]
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=table.schema.metadata))
 
 
-def _cast(table: pa.Table, name: str, dtype: pa.DataType) -> pa.Table:
-    if name not in table.column_names:
-        return table
-    idx = table.schema.get_field_index(name)
-    return table.set_column(idx, name, pc.cast(table[name], dtype))
+def _cast_columns(table: pa.Table, types: dict[str, pa.DataType]) -> dict[str, pa.ChunkedArray]:
+    return {n: pc.cast(table[n], t) for n, t in types.items() if n in table.column_names}
 
 
 def _parse_date32(col: pa.Array | pa.ChunkedArray) -> pa.Array | pa.ChunkedArray:
@@ -84,39 +125,40 @@ def _parse_date32(col: pa.Array | pa.ChunkedArray) -> pa.Array | pa.ChunkedArray
     if pa.types.is_timestamp(col.type):
         return pc.cast(col, pa.date32())
     if pa.types.is_string(col.type):
-        ts = pc.strptime(col, format="%Y-%m-%d", unit="s", error_is_null=True)
-        return pc.cast(ts, pa.date32())
+        # Arrow's string->date32 cast parses ISO "%Y-%m-%d" directly in one
+        # pass; strptime (lenient, bad values -> null) only if a value fails.
+        try:
+            return pc.cast(col, pa.date32())
+        except pa.ArrowInvalid:
+            ts = pc.strptime(col, format="%Y-%m-%d", unit="s", error_is_null=True)
+            return pc.cast(ts, pa.date32())
     return pc.cast(col, pa.date32())
 
 
 def _process_calendar(t: pa.Table) -> pa.Table:
-    t = _set(t, "date", _parse_date32(t["date"]))
-    t = _cast(t, "wm_yr_wk", pa.int32())
-    for c in ("wday", "month", "year"):
-        t = _cast(t, c, pa.int16())
-    for c in ("snap_CA", "snap_TX", "snap_WI"):
-        t = _cast(t, c, pa.int8())
-    return t
+    types: dict[str, pa.DataType] = {"wm_yr_wk": pa.int32()}
+    types.update(dict.fromkeys(("wday", "month", "year"), pa.int16()))
+    types.update(dict.fromkeys(("snap_CA", "snap_TX", "snap_WI"), pa.int8()))
+    updates = _cast_columns(t, types)
+    if "date" in t.column_names:
+        updates["date"] = _parse_date32(t["date"])
+    return _replace_columns(t, updates)
 
 
 def _process_sell_prices(t: pa.Table) -> pa.Table:
-    t = _cast(t, "wm_yr_wk", pa.int32())
-    t = _cast(t, "sell_price", pa.float32())
-    return t
+    return _replace_columns(
+        t, _cast_columns(t, {"wm_yr_wk": pa.int32(), "sell_price": pa.float32()})
+    )
 
 
 def _process_sales_wide(t: pa.Table) -> pa.Table:
-    for name in t.column_names:
-        if name.startswith("d_"):
-            t = _cast(t, name, pa.int32())
-    return t
+    d_cols = [n for n in t.column_names if n.startswith("d_")]
+    return _replace_columns(t, _cast_columns(t, dict.fromkeys(d_cols, pa.int32())))
 
 
 def _process_sample_submission(t: pa.Table) -> pa.Table:
-    for name in t.column_names:
-        if name.startswith("F"):
-            t = _cast(t, name, pa.float32())
-    return t
+    f_cols = [n for n in t.column_names if n.startswith("F")]
+    return _replace_columns(t, _cast_columns(t, dict.fromkeys(f_cols, pa.float32())))
 
 
 _PROCESSORS: dict[str, Any] = {
@@ -128,9 +170,214 @@ _PROCESSORS: dict[str, Any] = {
 }
 
 
+def _silver_writer(sink: Any, schema: pa.Schema) -> pq.ParquetWriter:
+    """
+    zstd-3 ParquetWriter; the small, run-heavy d_* sales counts use
+    DELTA_BINARY_PACKED (smaller and faster to decode than plain + snappy),
+    every other column keeps dictionary encoding.
+    """
+    delta_cols = [n for n in schema.names if n.startswith("d_")]
+    return pq.ParquetWriter(
+        sink,
+        schema,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=[n for n in schema.names if not n.startswith("d_")],
+        column_encoding=dict.fromkeys(delta_cols, "DELTA_BINARY_PACKED") or None,
+        data_page_version="2.0",
+        write_statistics=True,
+    )
+
+
+def _rewrite_parquet(in_path: Path, out_path: Path, process: Any) -> pq.FileMetaData:
+    """
+    Apply `process` to `in_path` one row group at a time and stream the result
+    to `out_path`, so peak memory is about one row group rather than the file.
+
+    Returns the written file's footer metadata. The file goes straight to disk
+    from Arrow's C++ writer (no Python-level sink holding the GIL per page);
+    run() hashes it afterwards with the other digests. It is written to a temp
+    file in the same directory and renamed into place only once complete: a
+    failure partway must not leave a valid-but-truncated Parquet file that the
+    next run would reuse as "exists".
+    """
+    meta = pq.read_metadata(in_path)
+    pf = pq.ParquetFile(
+        in_path,
+        metadata=meta,
+        read_dictionary=[c for c in DICT_COLUMNS if c in meta.schema.names],
+    )
+    tmp = out_path.with_name(f"{out_path.name}.{os.getpid()}.tmp")
+    writer: pq.ParquetWriter | None = None
+    try:
+        try:
+            for rg in range(pf.num_row_groups):
+                t = process(pf.read_row_group(rg))
+                if writer is None:
+                    writer = _silver_writer(tmp, t.schema)
+                elif not t.schema.equals(writer.schema):
+                    t = t.cast(writer.schema)
+                writer.write_table(t, row_group_size=SILVER_ROWS_PER_GROUP)
+            if writer is None:  # no row groups: still write a typed, empty file
+                t = process(pf.schema_arrow.empty_table())
+                writer = _silver_writer(tmp, t.schema)
+                writer.write_table(t)
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp, out_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return pq.read_metadata(out_path)
+
+
+@functools.lru_cache(maxsize=64)
+def _footer(path_str: str, size: int, mtime_ns: int) -> pq.FileMetaData:
+    """Parsed Parquet footer, reused while the file's (size, mtime_ns) are unchanged."""
+    return pq.read_metadata(path_str)
+
+
+def _previous_entries(report_path: Path) -> tuple[dict[str, dict[str, Any]], int]:
+    """Per-file entries of the last silver report and its mtime_ns ({}, 0 if unusable)."""
+    try:
+        mtime_ns = report_path.stat().st_mtime_ns
+        files = json.loads(report_path.read_bytes())["files"]
+        return {f["name"]: f for f in files}, mtime_ns
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}, 0
+
+
+def _reuse_previous(
+    prev: dict[str, Any] | None,
+    report_mtime_ns: int,
+    in_st: os.stat_result,
+    out_st: os.stat_result,
+) -> SilverFileReport | None:
+    """
+    The previous report's entry, if neither file changed since it was written.
+
+    Cheap fingerprint: same sizes as recorded, both files older than the report,
+    and digests present. Then the footer read and hashing are skipped entirely.
+    """
+    if (
+        prev is None
+        or prev.get("status") not in ("ok", "exists")
+        or prev.get("input_bytes") != in_st.st_size
+        or prev.get("output_bytes") != out_st.st_size
+        or max(in_st.st_mtime_ns, out_st.st_mtime_ns) >= report_mtime_ns
+        or not (prev.get("input_sha256") and prev.get("output_sha256"))
+    ):
+        return None
+    try:
+        return SilverFileReport(**{**prev, "status": "exists"})
+    except TypeError:  # report written by a different SilverFileReport layout
+        return None
+
+
+def _silver_one(
+    name: str,
+    bronze_dir: Path,
+    silver_dir: Path,
+    force: bool,
+    prev: tuple[dict[str, Any] | None, int] = (None, 0),
+) -> tuple[SilverFileReport, str | None]:
+    """
+    Rewrite one bronze file to silver; returns its report and error repr, if any.
+
+    prev: (this file's entry in the previous report, that report's mtime_ns),
+    used to short-circuit unchanged files when not forcing.
+    """
+    in_path = bronze_dir / name
+    out_path = silver_dir / name
+
+    if not in_path.exists():
+        return (
+            SilverFileReport(
+                name=name,
+                status="missing",
+                input_path=str(in_path),
+                output_path=None,
+                rows=None,
+                columns=None,
+                input_bytes=None,
+                output_bytes=None,
+                input_sha256=None,
+                output_sha256=None,
+            ),
+            None,
+        )
+
+    if out_path.exists() and not force:
+        out_st = out_path.stat()
+        reused = _reuse_previous(*prev, in_path.stat(), out_st)
+        if reused is not None:
+            return reused, None
+        meta = _footer(str(out_path), out_st.st_size, out_st.st_mtime_ns)
+        return (
+            SilverFileReport(
+                name=name,
+                status="exists",
+                input_path=str(in_path),
+                output_path=str(out_path),
+                rows=meta.num_rows,
+                columns=meta.num_columns,
+                input_bytes=in_path.stat().st_size,
+                output_bytes=out_st.st_size,
+                input_sha256=None,  # hashed in run()
+                output_sha256=None,
+            ),
+            None,
+        )
+
+    try:
+        logger.info("Silver: %s -> %s", in_path.name, out_path.name)
+        meta = _rewrite_parquet(in_path, out_path, _PROCESSORS.get(name, lambda x: x))
+        return (
+            SilverFileReport(
+                name=name,
+                status="ok",
+                input_path=str(in_path),
+                output_path=str(out_path),
+                rows=meta.num_rows,
+                columns=meta.num_columns,
+                input_bytes=in_path.stat().st_size,
+                output_bytes=out_path.stat().st_size,
+                input_sha256=None,  # hashed in run()
+                output_sha256=None,
+            ),
+            None,
+        )
+    except Exception as err:
+        return (
+            SilverFileReport(
+                name=name,
+                status="error",
+                input_path=str(in_path),
+                output_path=str(out_path) if out_path.exists() else None,
+                rows=None,
+                columns=None,
+                input_bytes=in_path.stat().st_size if in_path.exists() else None,
+                output_bytes=out_path.stat().st_size if out_path.exists() else None,
+                input_sha256=cached_sha256(in_path) if in_path.exists() else None,
+                output_sha256=cached_sha256(out_path) if out_path.exists() else None,
+            ),
+            repr(err),
+        )
+
+
+def _report_table(files: list[SilverFileReport]) -> pa.Table:
+    """Per-file report facts as one column per field (one row per file)."""
+    return pa.table(
+        {f.name: [getattr(r, f.name) for r in files] for f in REPORT_TABLE_SCHEMA},
+        schema=REPORT_TABLE_SCHEMA,
+    )
+
+
 def run(
     config_path: str | Path = "configs/default.yaml",
     *,
+    cfg: dict[str, Any] | None = None,
     force: bool = False,
     strict: bool = True,
 ) -> Path:
@@ -141,10 +388,11 @@ def run(
     Output: data/processed/m5/silver/*.parquet
     Report: outputs/reports/silver_m5.json
     """
-    cfg = load_config(config_path)
+    if cfg is None:
+        cfg = load_config(config_path)
     ensure_dirs(cfg)
 
-    started = datetime.now(timezone.utc)
+    started = utc_now_iso()
 
     bronze_dir = cfg["paths"]["data_interim"] / DATASET_ID / "bronze"
     silver_dir = cfg["paths"]["data_processed"] / DATASET_ID / "silver"
@@ -166,93 +414,58 @@ def run(
         overall_status = "missing_input"
         notes["missing_reason"] = "Bronze dir not found. Run bronze-m5 first."
 
-    for name in BRONZE_FILES:
-        in_path = bronze_dir / name
-        out_path = silver_dir / name
-
-        if not in_path.exists():
-            overall_status = "partial" if overall_status == "ok" else overall_status
-            file_reports.append(
-                SilverFileReport(
-                    name=name,
-                    status="missing",
-                    input_path=str(in_path),
-                    output_path=None,
-                    rows=None,
-                    columns=None,
-                    input_bytes=None,
-                    output_bytes=None,
-                    input_sha256=None,
-                    output_sha256=None,
-                )
+    prev_by_name, prev_mtime_ns = ({}, 0) if force else _previous_entries(report_path)
+
+    # Files are independent and Arrow releases the GIL for Parquet decode,
+    # casts and encode, so all of them are rewritten concurrently.
+    with ThreadPoolExecutor(max_workers=len(BRONZE_FILES)) as ex:
+        results = list(
+            ex.map(
+                lambda n: _silver_one(
+                    n, bronze_dir, silver_dir, force, (prev_by_name.get(n), prev_mtime_ns)
+                ),
+                BRONZE_FILES,
             )
-            continue
-
-        if out_path.exists() and not force:
-            meta = pq.read_metadata(out_path)
-            file_reports.append(
-                SilverFileReport(
-                    name=name,
-                    status="exists",
-                    input_path=str(in_path),
-                    output_path=str(out_path),
-                    rows=meta.num_rows,
-                    columns=meta.num_columns,
-                    input_bytes=in_path.stat().st_size,
-                    output_bytes=out_path.stat().st_size,
-                    input_sha256=sha256_file(in_path),
-                    output_sha256=sha256_file(out_path),
-                )
-            )
-            continue
+        )
 
-        try:
-            logger.info("Silver: %s -> %s", in_path.name, out_path.name)
-            t = pq.read_table(in_path)
-            t2 = _PROCESSORS.get(name, lambda x: x)(t)
-            pq.write_table(t2, out_path, compression="snappy", use_dictionary=True)
-
-            meta = pq.read_metadata(out_path)
-            file_reports.append(
-                SilverFileReport(
-                    name=name,
-                    status="ok",
-                    input_path=str(in_path),
-                    output_path=str(out_path),
-                    rows=meta.num_rows,
-                    columns=meta.num_columns,
-                    input_bytes=in_path.stat().st_size,
-                    output_bytes=out_path.stat().st_size,
-                    input_sha256=sha256_file(in_path),
-                    output_sha256=sha256_file(out_path),
-                )
-            )
-        except Exception as err:
+    for rep, err in results:
+        file_reports.append(rep)
+        if rep.status == "missing":
+            overall_status = "partial" if overall_status == "ok" else overall_status
+        elif rep.status == "error":
             overall_status = "error"
-            notes["error"] = repr(err)
-            file_reports.append(
-                SilverFileReport(
-                    name=name,
-                    status="error",
-                    input_path=str(in_path),
-                    output_path=str(out_path) if out_path.exists() else None,
-                    rows=None,
-                    columns=None,
-                    input_bytes=in_path.stat().st_size if in_path.exists() else None,
-                    output_bytes=out_path.stat().st_size if out_path.exists() else None,
-                    input_sha256=sha256_file(in_path) if in_path.exists() else None,
-                    output_sha256=sha256_file(out_path) if out_path.exists() else None,
-                )
-            )
-
-    finished = datetime.now(timezone.utc)
+            notes["error"] = err
+
+    # Hash every still-missing digest at once on a thread pool: hashlib
+    # releases the GIL, so they run in parallel. Reused report entries need
+    # nothing.
+    todo = [
+        (r, side)
+        for r in file_reports
+        if r.status in ("ok", "exists")
+        for side in ("input", "output")
+        if getattr(r, f"{side}_sha256") is None
+    ]
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(8, len(todo))) as ex:
+            digests = ex.map(lambda t: cached_sha256(Path(getattr(t[0], f"{t[1]}_path"))), todo)
+            for (r, side), digest in zip(todo, digests, strict=True):
+                setattr(r, f"{side}_sha256", digest)
+
+    # Columnar copy of the per-file report next to the JSON one, kept out of
+    # the silver dir (which holds the dataset files and their .sha256 sidecars).
+    table_path = report_path.with_suffix(".parquet")
+    pq.write_table(_report_table(file_reports), table_path, compression="zstd")
+    notes["report_table_path"] = str(table_path)
+
+    finished = utc_now_iso()
 
     report = SilverReport(
         pipeline="silver_m5",
         dataset_id=DATASET_ID,
         status=overall_status,
-        started_at_utc=started.isoformat(),
-        finished_at_utc=finished.isoformat(),
+        started_at_utc=started,
+        finished_at_utc=finished,
         config_path=str(cfg["config_path"]),
         bronze_dir=str(bronze_dir),
         silver_dir=str(silver_dir),
@@ -261,7 +474,7 @@ def run(
         notes=notes,
     )
 
-    report_path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    write_json(report_path, report)
 
     if overall_status != "ok" and strict:
         raise RuntimeError(notes.get("missing_reason", "Silver pipeline failed."))
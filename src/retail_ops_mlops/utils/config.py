@@ -1,25 +1,148 @@
 from __future__ import annotations
 
+import contextlib
+import copy
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import time
+from collections.abc import Iterable
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
 import yaml
 
+# libyaml's C loader when PyYAML was built with it; same safe semantics.
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:  # optional: `pip install .[orjson]`
+    orjson = None
+
+
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string with fixed microsecond precision."""
+    return datetime.fromtimestamp(time.time(), timezone.utc).isoformat(timespec="microseconds")
+
+
+def write_json(path: Path, data: Any) -> None:
+    """
+    Write `data` as indented UTF-8 JSON, via orjson when it is installed.
+
+    Report dataclasses can be passed as-is: orjson serializes them natively,
+    skipping the deep copy dataclasses.asdict() makes first. Non-str dict keys
+    are stringified, as json.dumps does.
+    """
+    if orjson is not None:
+        opts = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        path.write_bytes(orjson.dumps(data, option=opts))
+    else:
+        if dataclasses.is_dataclass(data) and not isinstance(data, type):
+            data = dataclasses.asdict(data)
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+# Opt-in on-disk cache of parsed configs, for process trees that load the same
+# config once per process (e.g. one CLI call per stage). Unset: nothing is
+# written and only the in-process LRU applies.
+CFG_CACHE_ENV = "RETAIL_OPS_MLOPS_CFG_CACHE_DIR"
+
+
+def _cfg_cache_dir() -> Path | None:
+    d = os.environ.get(CFG_CACHE_ENV)
+    return Path(d) if d else None
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_cfg(path_str: str, mtime_ns: int, size: int) -> dict[str, Any]:
+    """
+    Parse a YAML config, memoized per (path, mtime_ns, size).
+
+    The in-process LRU covers repeated loads within one run. When
+    $RETAIL_OPS_MLOPS_CFG_CACHE_DIR is set, a JSON copy there also covers
+    separate CLI processes; it is best-effort (unreadable or unwritable cache
+    dirs are ignored). JSON (not pickle) so nothing executable is ever loaded.
+    """
+    cache_dir = _cfg_cache_dir()
+    disk: Path | None = None
+    if cache_dir is not None:
+        key = hashlib.sha256(path_str.encode("utf-8")).hexdigest()[:16]
+        disk = cache_dir / f"cfg-{key}.json"
+        try:
+            cached = json.loads(disk.read_text(encoding="utf-8"))
+            if cached["mtime_ns"] == mtime_ns and cached["size"] == size:
+                return cached["data"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    data = yaml.load(Path(path_str).read_text(encoding="utf-8"), Loader=_SafeLoader)
+    if not isinstance(data, dict):
+        raise ValueError("Config root must be a mapping/dict.")
+
+    if disk is not None:
+        _write_cfg_cache(disk, mtime_ns, size, data)
+    return data
+
+
+def _write_cfg_cache(disk: Path, mtime_ns: int, size: int, data: dict[str, Any]) -> None:
+    """Atomically store `data` at `disk`, if it survives a JSON round-trip unchanged."""
+    tmp = disk.with_name(f"{disk.name}.{os.getpid()}.tmp")
+    try:
+        payload = json.dumps({"mtime_ns": mtime_ns, "size": size, "data": data})
+        if json.loads(payload)["data"] == data:
+            disk.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, disk)
+    except (OSError, TypeError, ValueError):
+        with contextlib.suppress(OSError):
+            tmp.unlink(missing_ok=True)
+
 
 def load_cfg(config_path: Path) -> dict[str, Any]:
     """Load YAML config. Canonical function used by CLI."""
     p = Path(config_path)
     if not p.exists():
         raise FileNotFoundError(f"Config not found: {p}")
-    data = yaml.safe_load(p.read_text(encoding="utf-8"))
-    if not isinstance(data, dict):
-        raise ValueError("Config root must be a mapping/dict.")
-    return data
+    st = p.stat()
+    # Callers get their own copy; the memoized dict must never be mutated.
+    return copy.deepcopy(_parse_cfg(str(p.resolve()), st.st_mtime_ns, st.st_size))
+
 
+def load_config(config_path: Path | str) -> dict[str, Any]:
+    """
+    Load YAML config with `paths.*` as absolute Paths (used by the lakehouse stages).
 
-# Backwards-compat alias (some modules may import load_config)
-def load_config(config_path: Path) -> dict[str, Any]:
-    return load_cfg(config_path)
+    Also sets `config_path` (absolute) and `project_root`. Relative entries are
+    anchored to the current working directory, exactly as the load_cfg() stages
+    (build-features, dq, train, eval) open them, so both loaders agree whether
+    the package is installed or run from a checkout. They are joined and
+    normalized lexically: no per-component resolve() syscalls, and env vars are
+    only expanded when a "$" is present.
+    """
+    cfg = load_cfg(Path(config_path))
+    root = Path.cwd()
+
+    paths = cfg.get("paths")
+    if not isinstance(paths, dict):
+        raise ValueError("Config must contain 'paths' mapping.")
+    for key, val in paths.items():
+        s = str(val)
+        if "$" in s:
+            s = os.path.expandvars(s)
+        p = Path(s)
+        paths[key] = p if p.is_absolute() else Path(os.path.normpath(root / p))
+
+    cfg_path = Path(config_path)
+    cfg["config_path"] = cfg_path if cfg_path.is_absolute() else root / cfg_path
+    cfg["project_root"] = root
+    return cfg
 
 
 def ensure_project_dirs(cfg: dict[str, Any], root: Path | None = None) -> None:
@@ -43,5 +166,29 @@ def ensure_project_dirs(cfg: dict[str, Any], root: Path | None = None) -> None:
     if missing:
         raise ValueError(f"Missing required paths in config: {missing}")
 
-    for k in required_keys:
-        Path(paths[k]).mkdir(parents=True, exist_ok=True)
+    _mkdirs(Path(paths[k]) for k in required_keys)
+
+
+def ensure_dirs(cfg: dict[str, Any]) -> None:
+    """Create every `paths.*` directory of a load_config() config (idempotent)."""
+    _mkdirs(cfg["paths"].values())
+
+
+def _mkdirs(dirs: Iterable[Path]) -> None:
+    """
+    mkdir -p for several directories, statting each shared ancestor once.
+
+    mkdir(parents=True) re-walks data/, outputs/, ... for every key; here each
+    path climbs only to the nearest ancestor already seen or found on disk.
+    """
+    seen: set[Path] = set()
+    for d in dirs:
+        missing: list[Path] = []
+        p = d
+        while p not in seen and not p.exists():
+            missing.append(p)
+            p = p.parent
+        seen.add(p)
+        for q in reversed(missing):
+            q.mkdir(exist_ok=True)
+            seen.add(q)
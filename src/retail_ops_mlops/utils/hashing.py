@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Above this size the file is mapped and hashed with one update() call: the
+# kernel pages it in directly, with no copy into a read buffer.
+MMAP_MIN_BYTES = 8 << 20
+READ_CHUNK_BYTES = 1 << 20
+
+
+def sha256_file(path: Path) -> str:
+    """
+    SHA-256 hex digest of a file.
+
+    Large files are mmap'ed and hashed in a single update(); smaller ones go
+    through hashlib.file_digest (3.11+, C read loop) or a readinto() loop.
+    OpenSSL uses SHA-NI/ARMv8 SHA instructions where available.
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    with path.open("rb", buffering=0) as f:
+        if size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        # 3.10: same loop file_digest runs, one reused buffer, no bytes per chunk.
+        h = hashlib.sha256()
+        buf = bytearray(READ_CHUNK_BYTES)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            h.update(view[:n])
+        return h.hexdigest()
+
+
+def cached_sha256(
+    path: Path,
+    cache_dir: Path | None = None,
+    st: os.stat_result | None = None,
+    *,
+    sidecar: bool = True,
+) -> str:
+    """
+    sha256_file() memoized in a JSON sidecar (<cache_dir>/<name>.sha256).
+
+    The digest is reused while the file's (size, mtime_ns) are unchanged, so
+    idempotent reruns don't re-read hundreds of MB just to fill a report.
+    Within one process the result is also kept in memory, so a stage that
+    reports the same input several times touches neither the file nor its
+    sidecar again. cache_dir defaults to the file's own directory; pass another
+    directory to keep read-only inputs (e.g. raw extracts) untouched, or
+    sidecar=False to keep only the in-memory cache and write nothing. `st` lets
+    callers that already stat()ed the file skip a second stat.
+
+    The sidecar is best-effort: if it can't be written (read-only or shared
+    dir, quota) the digest is still returned.
+    """
+    st = st or path.stat()
+    cache_dir_str = str(cache_dir or path.parent) if sidecar else ""
+    return _sidecar_sha256(str(path), cache_dir_str, st.st_size, st.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _sidecar_sha256(path_str: str, cache_dir_str: str, size: int, mtime_ns: int) -> str:
+    path = Path(path_str)
+    if not cache_dir_str:  # in-memory only
+        return sha256_file(path)
+    sidecar = Path(cache_dir_str) / f"{path.name}.sha256"
+    try:
+        cached = json.loads(sidecar.read_text(encoding="utf-8"))
+        if cached["size"] == size and cached["mtime_ns"] == mtime_ns:
+            return str(cached["digest"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    digest = sha256_file(path)
+    payload = {"size": size, "mtime_ns": mtime_ns, "digest": digest}
+    # Per-writer tmp name: concurrent stages may fill the same sidecar.
+    tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, sidecar)
+    except OSError as err:
+        logger.debug("sha256 sidecar not written (%s): %s", sidecar, err)
+        with contextlib.suppress(OSError):
+            tmp.unlink(missing_ok=True)
+    return digest
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import logging
+import sys
 
 from rich.logging import RichHandler
 
 
 def setup_logging(level: str = "INFO") -> None:
     """
-    Configure root logging with RichHandler for readable logs.
+    Configure root logging: plain stderr lines below WARNING, RichHandler above.
+
+    Per-file INFO progress from the pipelines skips Rich's markup rendering;
+    warnings and errors keep the readable Rich output and tracebacks.
     """
-    logging.basicConfig(
-        level=level.upper(),
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True)],
-    )
+    plain = logging.StreamHandler(sys.stderr)
+    plain.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%X"))
+    plain.addFilter(lambda record: record.levelno < logging.WARNING)
+
+    rich = RichHandler(level=logging.WARNING, rich_tracebacks=True)
+    rich.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+
+    logging.basicConfig(level=level.upper(), handlers=[plain, rich])
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def workspace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Empty project tree with the default config, as the cwd (paths resolve against it)."""
+    (tmp_path / "configs").mkdir()
+    shutil.copyfile(ROOT / "configs" / "default.yaml", tmp_path / "configs" / "default.yaml")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("RETAIL_OPS_MLOPS_CFG_CACHE_DIR", raising=False)  # no disk config cache
+    return tmp_path
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from retail_ops_mlops.pipelines import build_features_m5
+
+N_SERIES = 7
+N_DAYS = 60
+
+
+def _write_gold(root: Path, *, dict_d: bool) -> Path:
+    """Tiny gold sales sample + calendar; small row groups so series span groups."""
+    gold = root / "data" / "processed" / "m5" / "gold"
+    gold.mkdir(parents=True)
+
+    ids = np.repeat([f"ITEM_{i}_CA_1" for i in range(N_SERIES)], N_DAYS)
+    days = np.tile(np.arange(1, N_DAYS + 1), N_SERIES)
+    d = pa.array(np.char.add("d_", days.astype(str)))
+    sales = pa.table(
+        {
+            "id": ids,
+            "item_id": np.char.rpartition(ids.astype(str), "_CA")[:, 0],
+            "state_id": np.full(ids.size, "CA"),
+            "d": d.dictionary_encode() if dict_d else d,
+            "sales": ((days * 7 + np.arange(ids.size)) % 5).astype(np.int32),
+        }
+    )
+    pq.write_table(sales, gold / "fact_sales_long_sample.parquet", row_group_size=50)
+
+    cal_days = np.arange(1, N_DAYS + 1)
+    cal = pa.table(
+        {
+            "d": np.char.add("d_", cal_days.astype(str)),
+            "wm_yr_wk": (11101 + cal_days // 7).astype(np.int32),
+            "wday": (cal_days % 7 + 1).astype(np.int16),
+            "month": np.full(N_DAYS, 1, dtype=np.int16),
+            "year": np.full(N_DAYS, 2011, dtype=np.int16),
+            "snap_CA": (cal_days % 2).astype(np.int8),
+            "snap_TX": np.zeros(N_DAYS, dtype=np.int8),
+            "snap_WI": np.zeros(N_DAYS, dtype=np.int8),
+        }
+    )
+    pq.write_table(cal, gold / "dim_calendar.parquet")
+    return gold / "fact_sales_features_sample.parquet"
+
+
+def _build(workspace: Path, engine: str) -> pa.Table:
+    build_features_m5.run(Path("configs/default.yaml"), horizon=7, force=True, engine=engine)
+    return pq.read_table(workspace / "data/processed/m5/gold/fact_sales_features_sample.parquet")
+
+
+@pytest.mark.parametrize("dict_d", [False, True])
+def test_engines_write_same_features(workspace: Path, dict_d: bool) -> None:
+    pytest.importorskip("polars")
+    _write_gold(workspace, dict_d=dict_d)
+
+    by_pandas = _build(workspace, "pandas")
+    by_polars = _build(workspace, "polars")
+
+    assert by_pandas.schema.equals(by_polars.schema)
+    assert by_pandas.num_rows == N_SERIES * N_DAYS
+    # Row order may differ between engines (both cluster by id, ascending d_num).
+    key = ["id", "d_num"]
+    left = by_pandas.to_pandas().sort_values(key, ignore_index=True)
+    right = by_polars.to_pandas().sort_values(key, ignore_index=True)
+    assert left.astype(str).equals(right.astype(str))
+
+
+def test_pandas_features_values(workspace: Path) -> None:
+    _write_gold(workspace, dict_d=True)
+    df = _build(workspace, "pandas").to_pandas()
+
+    s = df[df["id"] == "ITEM_3_CA_1"].sort_values("d_num")
+    sales = s["sales"].to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(s["lag_7"].to_numpy()[7:], sales[:-7])
+    np.testing.assert_allclose(
+        s["roll_mean_7"].to_numpy()[7:], np.convolve(sales, np.ones(7) / 7, "valid")[:-1], rtol=1e-6
+    )
+    assert s["is_test"].sum() == 7 and s["is_test"].to_numpy()[-7:].all()
+    assert s["snap_CA"].tolist() == [d % 2 for d in s["d_num"]]
+
+
+def test_unknown_engine_rejected(workspace: Path) -> None:
+    _write_gold(workspace, dict_d=False)
+    with pytest.raises(ValueError, match="engine"):
+        build_features_m5.run(Path("configs/default.yaml"), force=True, engine="spark")
+
+
+@pytest.mark.parametrize("engine", ["pandas", "polars"])
+def test_unclustered_sales_are_sorted(workspace: Path, engine: str) -> None:
+    if engine == "polars":
+        pytest.importorskip("polars")
+    _write_gold(workspace, dict_d=False)
+    expected = _build(workspace, engine)
+
+    sales_path = workspace / "data/processed/m5/gold/fact_sales_long_sample.parquet"
+    sales = pq.read_table(sales_path)
+    shuffled = sales.take(np.random.default_rng(0).permutation(sales.num_rows))
+    pq.write_table(shuffled, sales_path, row_group_size=50)
+
+    got = _build(workspace, engine)
+
+    key = ["id", "d_num"]
+    left = expected.to_pandas().sort_values(key, ignore_index=True)
+    right = got.to_pandas().sort_values(key, ignore_index=True)
+    assert left.astype(str).equals(right.astype(str))
+
+
+def test_failed_build_leaves_no_features_file(
+    workspace: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _write_gold(workspace, dict_d=False)
+    calls = []
+
+    def fail_on_second(df: pd.DataFrame, cal: pd.DataFrame, h: int) -> pd.DataFrame:
+        calls.append(len(df))
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return features_pandas(df, cal, h)
+
+    features_pandas = build_features_m5._features_pandas
+    monkeypatch.setattr(build_features_m5, "_features_pandas", fail_on_second)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        build_features_m5.run(Path("configs/default.yaml"), horizon=7, force=True)
+
+    gold = workspace / "data/processed/m5/gold"
+    assert not any(p.name.startswith("fact_sales_features_sample") for p in gold.iterdir())
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+# Importing the CLI (and therefore `--help` / shell completion) must not pull in the
+# data stack. Pipeline imports belong inside command bodies, never at module level.
+HEAVY_MODULES = ("pandas", "pyarrow", "sklearn", "polars")
+
+
+def test_cli_import_does_not_load_heavy_modules() -> None:
+    code = (
+        "import sys\n"
+        "import retail_ops_mlops.cli\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "assert not loaded, f'heavy modules imported by cli: {loaded}'\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
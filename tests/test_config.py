@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from retail_ops_mlops.utils import config
+from retail_ops_mlops.utils.config import load_cfg, load_config
+
+
+def test_load_config_anchors_relative_paths_at_cwd(workspace: Path) -> None:
+    cfg = load_config("configs/default.yaml")
+
+    assert cfg["project_root"] == workspace
+    assert cfg["config_path"] == workspace / "configs" / "default.yaml"
+    assert cfg["paths"]["data_raw"] == workspace / "data" / "raw"
+    # Same location the load_cfg() stages open relative to the cwd.
+    raw = load_cfg(Path("configs/default.yaml"))["paths"]["data_raw"]
+    assert cfg["paths"]["data_raw"] == Path(raw).absolute()
+
+
+def test_load_cfg_returns_fresh_copies_and_sees_edits(workspace: Path) -> None:
+    path = workspace / "configs" / "default.yaml"
+    first = load_cfg(path)
+    first["paths"]["data_raw"] = "mutated"
+    assert load_cfg(path)["paths"]["data_raw"] == "data/raw"
+
+    path.write_text(path.read_text(encoding="utf-8") + "\nextra: 1\n", encoding="utf-8")
+    assert load_cfg(path)["extra"] == 1
+
+
+def test_cfg_disk_cache_is_opt_in(workspace: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = workspace / "configs" / "default.yaml"
+    cache = workspace / "cfg-cache"
+
+    config._parse_cfg.cache_clear()
+    load_cfg(path)
+    assert not cache.exists()
+
+    monkeypatch.setenv(config.CFG_CACHE_ENV, str(cache))
+    config._parse_cfg.cache_clear()
+    data = load_cfg(path)
+    assert [p.suffix for p in cache.iterdir()] == [".json"]
+
+    config._parse_cfg.cache_clear()
+    assert load_cfg(path) == data
+
+
+def test_cfg_disk_cache_tolerates_unwritable_dir(
+    workspace: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    not_a_dir = workspace / "file"
+    not_a_dir.write_text("x", encoding="utf-8")
+    monkeypatch.setenv(config.CFG_CACHE_ENV, str(not_a_dir / "cache"))
+    config._parse_cfg.cache_clear()
+
+    assert load_cfg(workspace / "configs" / "default.yaml")["paths"]["data_raw"] == "data/raw"
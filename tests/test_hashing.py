@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+from retail_ops_mlops.utils.hashing import cached_sha256, sha256_file
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_sha256_file_matches_hashlib(tmp_path: Path) -> None:
+    p = tmp_path / "blob.bin"
+    p.write_bytes(os.urandom(3 << 20))
+    assert sha256_file(p) == _sha(p.read_bytes())
+
+
+def test_cached_sha256_invalidates_on_size_and_mtime(tmp_path: Path) -> None:
+    p = tmp_path / "data.bin"
+    p.write_bytes(b"a" * 100)
+    assert cached_sha256(p) == _sha(b"a" * 100)
+    assert (tmp_path / "data.bin.sha256").exists()
+
+    # size change
+    p.write_bytes(b"b" * 101)
+    assert cached_sha256(p) == _sha(b"b" * 101)
+
+    # same size, new content: only mtime_ns differs
+    st = p.stat()
+    p.write_bytes(b"c" * 101)
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert cached_sha256(p) == _sha(b"c" * 101)
+
+
+def test_cached_sha256_reuses_sidecar_while_unchanged(tmp_path: Path) -> None:
+    p = tmp_path / "data.bin"
+    p.write_bytes(b"payload")
+    st = p.stat()
+    cached_sha256(p)
+
+    # Content swapped behind the cache's back with (size, mtime_ns) restored:
+    # the recorded digest is served, proving the file isn't re-read.
+    p.write_bytes(b"PAYLOAD")
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cached_sha256(p) == _sha(b"payload")
+
+
+def test_sidecar_is_best_effort(tmp_path: Path) -> None:
+    p = tmp_path / "data.bin"
+    p.write_bytes(b"x" * 10)
+    unwritable = tmp_path / "missing" / "dir"
+    assert cached_sha256(p, cache_dir=unwritable) == _sha(b"x" * 10)
+    assert not unwritable.exists()
+
+
+def test_no_sidecar_when_disabled(tmp_path: Path) -> None:
+    p = tmp_path / "data.bin"
+    p.write_bytes(b"y" * 10)
+    assert cached_sha256(p, sidecar=False) == _sha(b"y" * 10)
+    assert sorted(x.name for x in tmp_path.iterdir()) == ["data.bin"]
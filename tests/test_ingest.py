@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from retail_ops_mlops.pipelines import ingest_m5
+from retail_ops_mlops.utils.hashing import sha256_file
+
+
+def test_ingest_extracts_and_hashes_each_member(workspace: Path) -> None:
+    zip_path = workspace / "m5.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("calendar.csv", "d,wday\nd_1,1\n")
+        zf.writestr("nested/sell_prices.csv", "store_id,sell_price\nCA_1,1.5\n" * 100)
+        zf.writestr("empty_dir/", "")
+
+    report = json.loads(ingest_m5.run(zip_path="m5.zip").read_text(encoding="utf-8"))
+
+    extracted = Path(report["extracted_dir"])
+    assert report["status"] == "ok"
+    assert report["notes"]["zip_sha256"] == sha256_file(zip_path)
+    assert [f["path"] for f in report["extracted_files"]] == [
+        "calendar.csv",
+        "nested/sell_prices.csv",
+    ]
+    for f in report["extracted_files"]:
+        assert f["sha256"] == sha256_file(extracted / f["path"])
+        assert f["bytes"] == (extracted / f["path"]).stat().st_size
+
+
+def test_ingest_rejects_zip_slip(workspace: Path) -> None:
+    zip_path = workspace / "evil.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("../../escaped.csv", "x\n")
+
+    with pytest.raises(ValueError, match="escapes extraction dir"):
+        ingest_m5.run(zip_path=zip_path)
+    # ../../ from data/raw/m5/extracted would land in data/raw.
+    assert not (workspace / "data" / "raw" / "escaped.csv").exists()
+
+
+def test_ingest_missing_zip_writes_report(workspace: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        ingest_m5.run()
+
+    report = workspace / "outputs" / "reports" / "ingest_m5.json"
+    assert json.loads(report.read_text(encoding="utf-8"))["status"] == "missing_input"
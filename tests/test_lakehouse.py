@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from retail_ops_mlops.pipelines import (
+    bronze_m5,
+    build_features_m5,
+    dq_m5,
+    eval_m5,
+    gold_m5,
+    run_m5,
+    silver_m5,
+    train_m5,
+)
+from retail_ops_mlops.utils.hashing import sha256_file
+
+LAKEHOUSE = {"bronze_m5", "silver_m5", "gold_m5"}
+N_SERIES = 4
+N_DAYS = 60
+
+CALENDAR_CSV = (
+    "date,wm_yr_wk,weekday,wday,month,year,d,"
+    "event_name_1,event_type_1,event_name_2,event_type_2,snap_CA,snap_TX,snap_WI\n"
+    "2011-01-29,11101,Saturday,1,1,2011,d_1,,,,,0,0,0\n"
+    "2011-01-30,11101,Sunday,2,1,2011,d_2,SuperBowl,Sporting,,,0,0,0\n"
+    "2011-01-31,11101,Monday,3,1,2011,d_3,,,,,1,1,0\n"
+)
+
+
+def test_bronze_keeps_empty_event_strings(tmp_path: Path) -> None:
+    csv_path = tmp_path / "calendar.csv"
+    csv_path.write_text(CALENDAR_CSV)
+    out = tmp_path / "calendar.parquet"
+
+    rows = bronze_m5.csv_to_parquet_stream(
+        csv_path, out, column_types=bronze_m5.SCHEMAS["calendar.csv"]
+    )
+
+    tbl = pq.read_table(out)
+    assert rows == 3
+    assert tbl["event_name_1"].null_count == 0
+    assert tbl["event_name_1"].to_pylist() == ["", "SuperBowl", ""]
+
+
+def test_gold_flags_only_non_empty_events(tmp_path: Path) -> None:
+    csv_path = tmp_path / "calendar.csv"
+    csv_path.write_text(CALENDAR_CSV)
+    out = tmp_path / "calendar.parquet"
+    bronze_m5.csv_to_parquet_stream(csv_path, out, column_types=bronze_m5.SCHEMAS["calendar.csv"])
+
+    cal = gold_m5._calendar_gold(out)
+
+    assert cal["is_event_day"].to_pylist() == [False, True, False]
+    assert cal["is_weekend"].to_pylist() == [True, True, False]
+
+
+def test_silver_rewrite_leaves_no_partial_file(tmp_path: Path) -> None:
+    in_path = tmp_path / "in.parquet"
+    pq.write_table(pa.table({"x": list(range(10))}), in_path, row_group_size=2)
+    out_path = tmp_path / "out.parquet"
+    seen = []
+
+    def fail_on_fourth(t: pa.Table) -> pa.Table:
+        seen.append(t.num_rows)
+        if len(seen) == 4:
+            raise RuntimeError("boom")
+        return t
+
+    with pytest.raises(RuntimeError, match="boom"):
+        silver_m5._rewrite_parquet(in_path, out_path, fail_on_fourth)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.parquet"]
+
+    meta = silver_m5._rewrite_parquet(in_path, out_path, lambda t: t)
+    assert meta.num_rows == 10
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.parquet", "out.parquet"]
+
+
+def _write_raw(root: Path) -> None:
+    """Tiny M5-shaped CSV set in data/raw/m5/extracted (the ingest output layout)."""
+    ex = root / "data" / "raw" / "m5" / "extracted"
+    ex.mkdir(parents=True)
+
+    lines = [CALENDAR_CSV.splitlines()[0]]
+    for i in range(N_DAYS + 28):
+        day = date(2011, 1, 29) + timedelta(days=i)
+        event = "SuperBowl,Sporting" if i == 1 else ","
+        lines.append(
+            f"{day},{11101 + i // 7},{day:%A},{i % 7 + 1},{day.month},{day.year},"
+            f"d_{i + 1},{event},,,{i % 2},0,0"
+        )
+    (ex / "calendar.csv").write_text("\n".join(lines) + "\n")
+
+    items = [(f"FOODS_1_{s:03d}", ("CA_1", "TX_1")[s % 2]) for s in range(N_SERIES)]
+    for kind, n in (("validation", N_DAYS), ("evaluation", N_DAYS + 28)):
+        rows = [
+            "id,item_id,dept_id,cat_id,store_id,state_id,"
+            + ",".join(f"d_{i}" for i in range(1, n + 1))
+        ]
+        for s, (item, store) in enumerate(items):
+            sales = ",".join(str((s + i) % 4) for i in range(n))
+            rows.append(f"{item}_{store}_{kind},{item},FOODS_1,FOODS,{store},{store[:2]},{sales}")
+        (ex / f"sales_train_{kind}.csv").write_text("\n".join(rows) + "\n")
+
+    prices = ["store_id,item_id,wm_yr_wk,sell_price"]
+    prices += [f"{store},{item},{11101 + w},1.5" for item, store in items for w in range(2)]
+    (ex / "sell_prices.csv").write_text("\n".join(prices) + "\n")
+
+    sub = ["id," + ",".join(f"F{i}" for i in range(1, 29))]
+    sub += [f"{item}_{store}_validation," + ",".join("0" * 28) for item, store in items]
+    (ex / "sample_submission.csv").write_text("\n".join(sub) + "\n")
+
+
+def _stage_reports(report_path: Path) -> dict[str, dict]:
+    run = json.loads(report_path.read_text(encoding="utf-8"))
+    return {s["pipeline"]: json.loads(Path(s["report_path"]).read_text()) for s in run["stages"]}
+
+
+def test_bronze_silver_gold_on_tiny_csvs(workspace: Path) -> None:
+    _write_raw(workspace)
+
+    reports = _stage_reports(run_m5.run(only=LAKEHOUSE))
+
+    assert list(reports) == ["bronze_m5", "silver_m5", "gold_m5"]
+    assert {r["status"] for r in reports.values()} == {"ok"}
+    for r in reports.values():
+        for f in r["files"]:
+            out = f.get("parquet_path") or f.get("output_path")
+            digest = f.get("parquet_sha256") or f.get("output_sha256")
+            assert f["status"] == "ok"
+            assert digest == sha256_file(Path(out))
+
+    gold = workspace / "data" / "processed" / "m5" / "gold"
+    series = pq.read_table(gold / "dim_series.parquet")
+    assert series.num_rows == N_SERIES
+    cal = pq.read_table(gold / "dim_calendar.parquet")
+    assert cal["is_event_day"].to_pylist()[:3] == [False, True, False]
+    sample = pq.read_table(gold / "fact_sales_long_sample.parquet")
+    assert sample.num_rows == N_SERIES * N_DAYS
+    expected = sum((s + i) % 4 for s in range(N_SERIES) for i in range(N_DAYS))
+    assert sum(sample["sales"].to_pylist()) == expected
+
+    # A rerun without force reuses every output.
+    again = _stage_reports(run_m5.run(only=LAKEHOUSE))
+    assert {f["status"] for r in again.values() for f in r["files"]} == {"exists"}
+
+
+def test_run_m5_only_runs_selected_stages(workspace: Path) -> None:
+    _write_raw(workspace)
+
+    reports = _stage_reports(run_m5.run(only={"bronze_m5"}))
+
+    assert list(reports) == ["bronze_m5"]
+    assert not (workspace / "data" / "processed" / "m5" / "gold").exists()
+
+
+def test_run_m5_rejects_unknown_stage(workspace: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown run_m5 stages"):
+        run_m5.run(only={"bronze_m5", "platinum_m5"})
+
+
+@pytest.mark.parametrize("model", ["ridge", "lightgbm"])
+def test_features_dq_train_eval_on_lakehouse_gold(workspace: Path, model: str) -> None:
+    if model == "lightgbm":
+        pytest.importorskip("lightgbm")
+    _write_raw(workspace)
+    run_m5.run(only=LAKEHOUSE)
+    config = Path("configs/default.yaml")
+
+    build_features_m5.run(config, horizon=7, force=True)
+    dq = json.loads(dq_m5.run(config, horizon=7, force=True).read_text(encoding="utf-8"))
+    train_m5.run(config, horizon=7, force=True, model=model)
+    ev = json.loads(eval_m5.run(config, horizon=7, force=True, model=model).read_text())
+
+    assert dq["status"] == "ok"
+    assert dq["n_test"] == N_SERIES * 7
+    assert ev["n_test"] == N_SERIES * 7
+    assert all(np.isfinite(v) for v in ev["metrics"].values())
@@ -1,31 +1,33 @@
 from __future__ import annotations
 
+import functools
 import os
+import shutil
 import subprocess
+import sys
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
 
+
+@functools.cache
 def _powershell_exe() -> str:
     # 1) Explicit override (useful in CI)
     override = os.environ.get("POWERSHELL_EXE")
     if override:
         return override
 
-    # 2) Prefer pwsh if installed (GitHub Actions ubuntu)
+    # 2) Prefer pwsh if installed (GitHub Actions ubuntu). Resolved to an absolute
+    #    path once per session: a PATH lookup, not a PowerShell start-up per probe.
     for exe in ("pwsh", "powershell"):
-        try:
-            subprocess.run(
-                [exe, "-NoProfile", "-Command", "$PSVersionTable.PSVersion"],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            return exe
-        except Exception:
-            pass
+        found = shutil.which(exe)
+        if found:
+            return found
 
     # 3) Last resort
-    return "powershell"
+    return "powershell" if os.name == "nt" else "pwsh"
 
 
 def _venv_python(root: Path) -> str:
@@ -40,87 +42,195 @@ def _venv_python(root: Path) -> str:
     return "python"
 
 
-def _ensure_minimal_gold(root: Path) -> None:
-    """Create a small-but-robust gold features parquet for smoke tests.
+# Repo root, resolved once at import rather than in every test.
+ROOT = Path(__file__).resolve().parents[1]
+
+FIXTURE_DAYS = 60
+FIXTURE_TEST_DAYS = 10
+
+# Column types of the minimal gold features table, fixed up front so writing it
+# needs no pandas round-trip or type inference. The repeated id/day strings are
+# dictionary-encoded (one value + small int codes), like the pipeline reads them.
+_DICT_STR = pa.dictionary(pa.int16(), pa.string())
+FIXTURE_SCHEMA = pa.schema(
+    [
+        ("id", _DICT_STR),
+        ("d", _DICT_STR),
+        ("sales", pa.int8()),
+        ("d_num", pa.int64()),
+        ("is_test", pa.bool_()),
+        ("item_id", _DICT_STR),
+        ("dept_id", _DICT_STR),
+        ("cat_id", _DICT_STR),
+        ("store_id", _DICT_STR),
+        ("state_id", _DICT_STR),
+        ("lag_1", pa.float64()),
+        ("lag_7", pa.float64()),
+        ("lag_28", pa.float64()),
+        ("roll_mean_7", pa.float64()),
+        ("roll_mean_28", pa.float64()),
+        ("wm_yr_wk", pa.int64()),
+        ("wday", pa.int64()),
+        ("month", pa.int64()),
+        ("year", pa.int64()),
+        ("sell_price", pa.float64()),
+        ("snap_CA", pa.int64()),
+        ("snap_TX", pa.int64()),
+        ("snap_WI", pa.int64()),
+        ("event_name_1", pa.string()),
+        ("event_type_1", pa.string()),
+        ("event_name_2", pa.string()),
+        ("event_type_2", pa.string()),
+    ]
+)
+
+
+def _run_streamed(cmd: list[str], cwd: Path, tail_bytes: int = 256 << 10) -> int:
+    """Run `cmd` with stdout+stderr streamed through a pipe; on failure print only
+    the last `tail_bytes` of output. Memory stays bounded however long the log gets.
+
+    The happy path does no per-line work: the pipe is drained in raw 64 KiB reads
+    and only the tail of a failing run is ever decoded.
+    """
+    tail = bytearray()
+    with subprocess.Popen(
+        cmd, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1 << 16
+    ) as proc:
+        assert proc.stdout is not None
+        while chunk := proc.stdout.read1(1 << 16):
+            tail += chunk
+            if len(tail) > 2 * tail_bytes:
+                del tail[:-tail_bytes]
+        returncode = proc.wait()
+    if returncode != 0:
+        sys.stdout.write(bytes(tail[-tail_bytes:]).decode("utf-8", errors="replace"))
+    return returncode
+
+
+def _write_minimal_gold(root: Path) -> Path:
+    """Create a small-but-robust gold features parquet for smoke tests under `root`.
 
     Goal: ensure eval_m5 has >=2 test rows AFTER dropping NaNs.
     So we create a longer series with fully-populated lag/rolling columns,
     and mark the last 10 rows as test.
     """
-    features_path = (
-        root / "data" / "processed" / "m5" / "gold" / "fact_sales_features_sample.parquet"
+    path = root / "data" / "processed" / "m5" / "gold" / "fact_sales_features_sample.parquet"
+
+    import numpy as np
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Columns are built as typed NumPy arrays (one allocation each, no per-row
+    # Python objects or dtype inference), so `n` can grow for stress runs.
+    n = FIXTURE_DAYS
+    d_num = np.arange(1, n + 1, dtype=np.int64)
+
+    def full(value: object) -> np.ndarray:
+        return np.full(n, value)
+
+    def const_dict(value: str) -> pa.DictionaryArray:
+        # one dictionary entry, all-zero codes
+        return pa.DictionaryArray.from_arrays(np.zeros(n, dtype=np.int16), [value])
+
+    batch = pa.RecordBatch.from_pydict(
+        {
+            "id": const_dict("FOO_1_CA_1"),
+            "d": pa.DictionaryArray.from_arrays(
+                np.arange(n, dtype=np.int16), np.char.add("d_", d_num.astype(str))
+            ),
+            # small integer counts; train/eval cast to float32 themselves
+            "sales": (10 + (d_num - 1) % 5).astype(np.int8),
+            "d_num": d_num,
+            # last FIXTURE_TEST_DAYS rows are test
+            "is_test": d_num > n - FIXTURE_TEST_DAYS,
+            # categorical ids expected by pipeline
+            "item_id": const_dict("FOO_1"),
+            "dept_id": const_dict("FOO"),
+            "cat_id": const_dict("FOO"),
+            "store_id": const_dict("CA_1"),
+            "state_id": const_dict("CA"),
+            # lag/rolling features expected by pipeline (pre-filled, no NaNs)
+            "lag_1": full(10.0),
+            "lag_7": full(10.0),
+            "lag_28": full(10.0),
+            "roll_mean_7": full(10.0),
+            "roll_mean_28": full(10.0),
+            # calendar-ish
+            "wm_yr_wk": full(11111),
+            "wday": full(1),
+            "month": full(1),
+            "year": full(2016),
+            # price + SNAP
+            "sell_price": full(1.0),
+            "snap_CA": full(0),
+            "snap_TX": full(0),
+            "snap_WI": full(0),
+            # events
+            "event_name_1": full(None),
+            "event_type_1": full(None),
+            "event_name_2": full(None),
+            "event_type_2": full(None),
+        },
+        schema=FIXTURE_SCHEMA,
     )
+    # train/eval read Parquet, so no Feather; but a 60-row fixture gains nothing
+    # from a codec, so skip it. Dictionary pages only for the dictionary-typed
+    # columns. One batch, one row group.
+    dict_cols = [f.name for f in FIXTURE_SCHEMA if pa.types.is_dictionary(f.type)]
+    with pq.ParquetWriter(path, FIXTURE_SCHEMA, compression="none", use_dictionary=dict_cols) as w:
+        w.write_batch(batch)
+    return path
 
-    py = _venv_python(root)
 
-    # NOTE: use f-string only for the path; keep code as raw python.
-    code = f"""
-from pathlib import Path
-import pandas as pd
-
-path = Path(r\"{str(features_path)}\")
-path.parent.mkdir(parents=True, exist_ok=True)
-
-n = 60
-dates = pd.date_range("2016-01-01", periods=n, freq="D")
-
-df = pd.DataFrame({{
-    "id": ["FOO_1_CA_1"] * n,
-    "d": [f"d_{{i+1}}" for i in range(n)],
-    "sales": [float(10 + (i % 5)) for i in range(n)],
-    "d_num": list(range(1, n+1)),
-    # last 10 rows are test
-    "is_test": [False] * (n - 10) + [True] * 10,
-
-    # categorical ids expected by pipeline
-    "item_id": ["FOO_1"] * n,
-    "dept_id": ["FOO"] * n,
-    "cat_id": ["FOO"] * n,
-    "store_id": ["CA_1"] * n,
-    "state_id": ["CA"] * n,
-
-    # lag/rolling features expected by pipeline (pre-filled, no NaNs)
-    "lag_1": [10.0] * n,
-    "lag_7": [10.0] * n,
-    "lag_28": [10.0] * n,
-    "roll_mean_7": [10.0] * n,
-    "roll_mean_28": [10.0] * n,
-
-    # calendar-ish
-    "wm_yr_wk": [11111] * n,
-    "wday": [1] * n,
-    "month": [1] * n,
-    "year": [2016] * n,
-
-    # price + SNAP
-    "sell_price": [1.0] * n,
-    "snap_CA": [0] * n,
-    "snap_TX": [0] * n,
-    "snap_WI": [0] * n,
-
-    # events
-    "event_name_1": [None] * n,
-    "event_type_1": [None] * n,
-    "event_name_2": [None] * n,
-    "event_type_2": [None] * n,
-}})
-
-df.to_parquet(path, index=False)
-print("WROTE", path)
-"""
-
-    subprocess.run([py, "-c", code], check=True, cwd=str(root))
-
-
-def test_smoke_run_m5_ps1() -> None:
-    root = Path(__file__).resolve().parents[1]
-    ps1 = root / "scripts" / "run_m5.ps1"
+@pytest.fixture(scope="session")
+def smoke_workspace(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """
+    Throwaway project tree (config, dbt project, minimal gold table), built once
+    per session. Everything the smoke runs read or write stays out of the repo.
+    """
+    ws = tmp_path_factory.mktemp("smoke")
+    (ws / "configs").mkdir()
+    shutil.copyfile(ROOT / "configs" / "default.yaml", ws / "configs" / "default.yaml")
+    shutil.copytree(ROOT / "dbt", ws / "dbt")
+    _write_minimal_gold(ws)
+    return ws
+
+
+def test_smoke_pipeline_in_process(smoke_workspace: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The steps run_m5.ps1 orchestrates, called directly (no shell, no new interpreter)."""
+    from retail_ops_mlops.pipelines import eval_m5, train_m5
+    from retail_ops_mlops.utils.config import ensure_project_dirs, load_cfg
+
+    config = smoke_workspace / "configs" / "default.yaml"
+
+    # train/eval resolve config paths against cwd, like the CLI run from the repo root.
+    monkeypatch.chdir(smoke_workspace)
+
+    ensure_project_dirs(load_cfg(config))
+    train_m5.run(config, force=True)
+    eval_m5.run(config, force=True)
+
+    # One directory listing per output dir instead of a stat per artifact.
+    required = {
+        "outputs/reports": {"train_m5.json", "eval_m5.json"},
+        "outputs/models": {"m5_ridge_baseline.joblib"},
+        "outputs/tables": {"eval_m5_metrics.csv", "eval_m5_predictions.csv"},
+        "outputs/figures": {"eval_m5_pred_vs_true.png", "eval_m5_residuals.png"},
+    }
+    for rel, names in required.items():
+        with os.scandir(smoke_workspace / rel) as it:
+            missing = names - {e.name for e in it}
+        assert not missing, f"missing artifacts in {rel}: {sorted(missing)}"
+
+
+@pytest.mark.slow
+def test_smoke_run_m5_ps1(smoke_workspace: Path) -> None:
+    """Shell-integration path: run_m5.ps1 end to end (PowerShell + CLI + dbt)."""
+    ps1 = ROOT / "scripts" / "run_m5.ps1"
     assert ps1.exists(), f"Missing: {ps1}"
 
-    _ensure_minimal_gold(root)
-
     shell = _powershell_exe()
-    pyexe = _venv_python(root)
+    pyexe = _venv_python(ROOT)
 
     cmd = [
         shell,
@@ -134,8 +244,5 @@ def test_smoke_run_m5_ps1() -> None:
         pyexe,
     ]
 
-    proc = subprocess.run(cmd, cwd=str(root), capture_output=True, text=True)
-    if proc.returncode != 0:
-        print("STDOUT:\n", proc.stdout)
-        print("STDERR:\n", proc.stderr)
-    assert proc.returncode == 0
+    # The script resolves configs/, outputs/ and dbt/ against its cwd.
+    assert _run_streamed(cmd, smoke_workspace) == 0
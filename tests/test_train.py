@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from retail_ops_mlops.pipelines.train_m5 import _ridge_pipeline
+
+CAT = ["id", "item_id", "dept_id", "cat_id", "store_id", "state_id"]
+LAGS = ["lag_1", "lag_7", "lag_28", "roll_mean_7", "roll_mean_28"]
+CALENDAR = ["d_num", "wm_yr_wk", "wday", "month", "year", "snap_CA", "snap_TX", "snap_WI"]
+
+
+def _frame(n_series: int = 200, n_days: int = 60) -> tuple[pd.DataFrame, np.ndarray]:
+    """Feature frame with the real columns' scales (wm_yr_wk ~ 11100, year ~ 2011)."""
+    rng = np.random.default_rng(0)
+    sid = np.repeat(np.arange(n_series), n_days)
+    day = np.tile(np.arange(1, n_days + 1), n_series)
+    sales = rng.poisson(1 + sid % 5).astype(np.float64)
+    df = pd.DataFrame(
+        {
+            "id": [f"ID_{i}" for i in sid],
+            "item_id": [f"ITEM_{i // 2}" for i in sid],
+            "dept_id": [f"DEPT_{i % 7}" for i in sid],
+            "cat_id": [f"CAT_{i % 3}" for i in sid],
+            "store_id": [f"STORE_{i % 10}" for i in sid],
+            "state_id": [f"STATE_{i % 3}" for i in sid],
+            **{c: np.roll(sales, k + 1) for k, c in enumerate(LAGS)},
+            "d_num": day,
+            "wm_yr_wk": 11101 + day // 7,
+            "wday": day % 7 + 1,
+            "month": 1 + day // 31,
+            "year": np.full(day.size, 2011),
+            "snap_CA": day % 2,
+            "snap_TX": (day + 1) % 2,
+            "snap_WI": np.zeros(day.size, dtype=np.int64),
+        }
+    )
+    return df, sales
+
+
+def test_ridge_matches_baseline_ridge() -> None:
+    df, y = _frame()
+    num = LAGS + CALENDAR
+    X = df[num + CAT]
+
+    baseline = Pipeline(
+        steps=[
+            (
+                "pre",
+                ColumnTransformer(
+                    transformers=[
+                        ("num", "passthrough", num),
+                        ("cat", OneHotEncoder(handle_unknown="ignore"), CAT),
+                    ]
+                ),
+            ),
+            ("model", Ridge()),
+        ]
+    ).fit(X, y)
+
+    # train_m5 feeds a float32 numeric block and float32 target.
+    X32 = X.astype(dict.fromkeys(num, np.float32))
+    pipe = _ridge_pipeline(num, CAT).fit(X32, y.astype(np.float32))
+
+    np.testing.assert_allclose(pipe.predict(X32), baseline.predict(X), rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(
+        pipe.named_steps["model"].coef_, baseline.named_steps["model"].coef_, atol=1e-6
+    )